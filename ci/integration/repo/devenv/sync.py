@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from devenv.constants import SYSTEM_MACHINE
 from devenv.lib import config
+from devenv.lib import tasks
 from devenv.lib import tenv
 from devenv.lib import venv
 
@@ -11,11 +12,16 @@ def main(context: dict[str, str]) -> int:
 
     cfg = config.get_repo(reporoot)
 
-    tenv.install(
-        cfg["tenv"]["version"],
-        cfg["tenv"][SYSTEM_MACHINE],
-        cfg["tenv"][f"{SYSTEM_MACHINE}_sha256"],
-        reporoot,
+    graph = tasks.Graph()
+
+    graph.add(
+        "tenv",
+        lambda: tenv.install(
+            cfg["tenv"]["version"],
+            cfg["tenv"][SYSTEM_MACHINE],
+            cfg["tenv"][f"{SYSTEM_MACHINE}_sha256"],
+            reporoot,
+        ),
     )
 
     name = "foo"
@@ -23,10 +29,18 @@ def main(context: dict[str, str]) -> int:
         reporoot, name
     )
     url, sha256 = config.get_python(reporoot, python_version)
-    print(f"ensuring {name} venv at {venv_dir}...")
-    venv.ensure(venv_dir, python_version, url, sha256)
 
-    print(f"syncing {name} with {requirements}...")
-    venv.sync(reporoot, venv_dir, requirements, editable_paths, bins)
+    def ensure() -> None:
+        print(f"ensuring {name} venv at {venv_dir}...")
+        venv.ensure(venv_dir, python_version, url, sha256)
+
+    def sync() -> None:
+        print(f"syncing {name} with {requirements}...")
+        venv.sync(reporoot, venv_dir, requirements, editable_paths, bins)
+
+    graph.add(f"venv.{name}", ensure)
+    graph.add(f"venv.{name} sync", sync, deps=(f"venv.{name}",))
+
+    graph.run()
 
     return 0
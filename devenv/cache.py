@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import time
+from collections.abc import Sequence
+
+from devenv.lib import cache
+from devenv.lib import config
+from devenv.lib.context import Context
+from devenv.lib.modules import DevModuleInfo
+
+module_help = "Manage the download cache."
+
+
+def _fmt_size(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+def main(context: Context, argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=("stats", "prune", "verify"))
+    parser.add_argument(
+        "--max-size",
+        type=config.parse_size,
+        help="prune: evict down to this size instead of the configured max_size (0 empties the cache)",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        entries = cache.entries()
+        total = sum(e.size + e.trees for e in entries.values())
+        print(f"{cache.cache_root}")
+        print(
+            f"{len(entries)} entries, {_fmt_size(total)} of {_fmt_size(cache.max_size())}"
+        )
+        now = time.time()
+        for sha256, e in sorted(
+            entries.items(), key=lambda kv: kv[1].atime, reverse=True
+        ):
+            days = int((now - e.atime) // 86400)
+            unpacked = f"+{_fmt_size(e.trees)}" if e.trees else ""
+            print(
+                f"  {sha256[:12]}  {_fmt_size(e.size):>10}  {unpacked:>11}  {days:>4}d ago  {e.url or '(unknown origin)'}"
+            )
+    elif args.command == "prune":
+        evicted = cache.prune(args.max_size)
+        print(f"evicted {len(evicted)} entries")
+    elif args.command == "verify":
+        corrupt = cache.verify()
+        for sha256 in corrupt:
+            print(f"removed corrupt entry {sha256}")
+        if corrupt:
+            return 1
+
+    return 0
+
+
+module_info = DevModuleInfo(
+    action=main, name=__name__, command="cache", help=module_help
+)
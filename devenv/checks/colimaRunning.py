@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from devenv.checks import colimaSsh
+from devenv.checks import dockerDesktop
+from devenv.lib import colima
+from devenv.lib_check.types import checker
+from devenv.lib_check.types import fixer
+
+tags: set[str] = {"builtin", "colima"}
+name = "colima should be running"
+# colima won't start (or work) without these
+depends_on: set[str] = {colimaSsh.name, dockerDesktop.name}
+resources: set[str] = {"docker"}
+
+
+@checker
+def check() -> tuple[bool, str]:
+    status = colima.check()
+    if status == colima.ColimaStatus.UNHEALTHY:
+        return False, "Colima is running, but it's unhealthy."
+    if status != colima.ColimaStatus.UP:
+        return False, "Colima isn't running."
+    return True, ""
+
+
+@fixer
+def fix() -> tuple[bool, str]:
+    status = colima.start()
+    if status == colima.ColimaStatus.UNHEALTHY:
+        # https://github.com/abiosoft/colima/issues/949
+        status = colima.restart()
+    if status != colima.ColimaStatus.UP:
+        return False, "Colima failed to start."
+    return True, ""
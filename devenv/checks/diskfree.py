@@ -34,5 +34,8 @@ We can't autofix this, only you can clean up your own disk.
 
 You might want to try cleaning up unused Docker resources:
    docker system prune -a
+
+or shrinking devenv's download cache:
+   devenv cache prune --max-size 0
 """,
     )
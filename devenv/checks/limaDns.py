@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import sys
 
+from devenv.checks import colimaRunning
 from devenv.lib import colima
 from devenv.lib import proc
 from devenv.lib_check.types import checker
@@ -9,6 +10,10 @@ from devenv.lib_check.types import fixer
 
 tags: set[str] = {"builtin", "colima"}
 name = "colima's DNS isn't working"
+# it starts a container, and wifi doesn't change every minute
+ttl = 60
+depends_on: set[str] = {colimaRunning.name}
+resources: set[str] = {"docker", "network"}
 
 
 @checker
@@ -16,11 +21,7 @@ def check() -> tuple[bool, str]:
     # dns resolution can... stop working if colima's running
     # and wifi changes to some other network that gives macos some
     # weird nameservers
-
-    status = colima.check()
-    if status != colima.ColimaStatus.UP:
-        return False, "Colima isn't running."
-
+    # (that colima's running at all is checked by colimaRunning)
     try:
         proc.run(
             (
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import importlib.metadata
 import os
 import platform
 import pwd
@@ -22,8 +21,6 @@ Public doc:
 https://develop.sentry.dev/development-infrastructure/environment/#troubleshooting
 """
 
-version = importlib.metadata.version("sentry_devenv")
-
 CI = os.getenv("CI")
 SYSTEM = platform.system().lower()
 MACHINE = platform.machine()
@@ -54,3 +51,13 @@ homebrew_bin = f"{homebrew_repo}/bin"
 if INTEL_MAC:
     homebrew_repo = "/usr/local/Homebrew"
     homebrew_bin = "/usr/local/bin"
+
+
+def __getattr__(name: str) -> str:
+    # looking up our own version imports importlib.metadata and scans
+    # sys.path, which most commands don't need
+    if name == "version":
+        import importlib.metadata
+
+        return importlib.metadata.version("sentry_devenv")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
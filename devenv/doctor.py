@@ -2,12 +2,18 @@ from __future__ import annotations
 
 import argparse
 import importlib.util
+import os
+import time
 import typing
 from collections.abc import Callable
+from collections.abc import Collection
 from collections.abc import Iterable
+from collections.abc import Mapping
 from collections.abc import Sequence
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Executor
 from concurrent.futures import Future
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from pkgutil import walk_packages
 from types import ModuleType
 from typing import Dict
@@ -15,12 +21,31 @@ from typing import List
 
 import devenv.checks
 from devenv import constants
+from devenv.lib import config
+from devenv.lib import proc
+from devenv.lib import state
+from devenv.lib import tasks
 from devenv.lib.context import Context
 from devenv.lib.modules import DevModuleInfo
 from devenv.lib.repository import Repository
+from devenv.lib_check import results as results_cache
 from devenv.lib_check.types import checker
 from devenv.lib_check.types import fixer
 
+# seconds, configurable in the global config under [doctor]
+DEFAULT_CHECK_TIMEOUT = 120.0
+DEFAULT_TIMEOUT = 600.0
+
+# how many checks using each resource can run at once, configurable in
+# the global config under [doctor.limits] (unlisted resources get 1)
+DEFAULT_LIMITS = {
+    # checks talking to the same docker daemon (or colima vm) mostly
+    # just queue up behind each other there
+    "docker": 1,
+    "network": 4,
+    "cpu": os.cpu_count() or 1,
+}
+
 
 class Check:
     """
@@ -29,8 +54,16 @@ class Check:
     - tags: set[str]
     - check: Callable[[], tuple[bool, str]]
     - fix: Callable[[], tuple[bool, str]]
+    - ttl: float (optional, default 0)
+    - depends_on: set[str] (optional, the names of other checks)
+    - timeout: float (optional, seconds, defaults to the global config's
+      [doctor] check_timeout)
+    - resources: set[str] (optional, e.g. {"docker"}, see run_checks)
 
     The check function should return a tuple of (ok, msg).
+    A pass is reused by later doctor runs for ttl seconds (or until the
+    module changes), so expensive checks should set one.
+    A check isn't run until everything it depends_on passes (see run_checks).
     The fix function should return a tuple of (ok, msg).
 
     The check and fix functions are wrapped with the checker and fixer decorators.
@@ -40,6 +73,12 @@ class Check:
     tags: set[str]
     check: Callable[[], tuple[bool, str]]
     fix: Callable[[], tuple[bool, str]]
+    ttl: float
+    depends_on: set[str]
+    timeout: float | None
+    resources: set[str]
+    digest: str
+    key: str
 
     def __init__(self, module: ModuleType):
         # Check that the module has the required attributes.
@@ -76,6 +115,41 @@ class Check:
             raise ValueError("`fix(...)` should return a tuple of (bool, str)")
         self.fix = fixer(module.fix)
 
+        ttl = getattr(module, "ttl", 0)
+        if isinstance(ttl, bool) or not isinstance(ttl, (int, float)):
+            raise ValueError(
+                "the `ttl` attribute should be a number of seconds"
+            )
+        self.ttl = ttl
+
+        depends_on: object = getattr(module, "depends_on", set())
+        if not isinstance(depends_on, set):
+            raise ValueError("the `depends_on` attribute should be a set")
+        self.depends_on = depends_on
+
+        timeout = getattr(module, "timeout", None)
+        if timeout is not None and (
+            isinstance(timeout, bool)
+            or not isinstance(timeout, (int, float))
+            or timeout <= 0
+        ):
+            raise ValueError(
+                "the `timeout` attribute should be a positive number of seconds"
+            )
+        self.timeout = timeout
+
+        resources: object = getattr(module, "resources", set())
+        if not isinstance(resources, set):
+            raise ValueError("the `resources` attribute should be a set")
+        self.resources = resources
+
+        # cached results are only valid for the same check, in the same
+        # place (a repo's checks are the same in all of its worktrees, but
+        # what they check isn't)
+        path = getattr(module, "__file__", None)
+        self.digest = state.file_digest(path) if path else ""
+        self.key = f"{path}:{self.name}" if path else self.name
+
         super().__init__()
 
 
@@ -141,37 +215,224 @@ def load_builtin_checks(
 
 def run_checks(
     checks: List[Check],
-    executor: ThreadPoolExecutor,
+    executor: Executor,
     skip: Iterable[Check] = (),
+    cached: Collection[Check] = (),
+    check_timeout: float | None = None,
+    timeout: float | None = None,
+    max_workers: int | None = None,
+    limits: Mapping[str, int] | None = None,
 ) -> Dict[Check, tuple[bool, str]]:
     """
     Run checks in parallel, and return a dict of results.
     Results are a tuple of (ok, msg).
+    Cached checks (see cached_checks) aren't run, they just pass.
+
+    A check only runs once every check it depends_on has passed, so
+    prerequisites are only checked once. If one fails (or is skipped),
+    its dependents are blocked, which fails them without running.
+    Dependencies on checks that weren't loaded are ignored.
+
+    Checks that take longer than their timeout (or check_timeout if they
+    don't declare one) fail, as does whatever is still running or hasn't
+    started timeout seconds into the whole run. The subprocesses a
+    timed out check started through proc.run are killed.
+
+    At most max_workers checks run at once, and at most limits[r] of
+    those (default 1) can use each of the resources r they declare. Checks
+    start in order as soon as they're able to.
     """
-    futures: dict[Check, Future[tuple[bool, str]]] = {}
+    if max_workers is not None and max_workers < 1:
+        raise ValueError("max_workers must be positive")
+    if limits is None:
+        limits = {}
+    in_use: dict[str, int] = {}
+
+    def available(check: Check) -> bool:
+        return (max_workers is None or len(running) < max_workers) and all(
+            in_use.get(r, 0) < max(limits.get(r, 1), 1) for r in check.resources
+        )
+
+    def release(check: Check) -> None:
+        for r in check.resources:
+            in_use[r] -= 1
+
+    # (set by _run_check once it's actually running)
+    started: dict[Check, float] = {}
+    scopes: dict[Check, proc.Scope] = {}
+    run_deadline = None if timeout is None else time.monotonic() + timeout
+
+    def deadline(check: Check) -> float | None:
+        t = check_timeout if check.timeout is None else check.timeout
+        start = started.get(check)
+        deadlines = [
+            d
+            for d in (
+                None if t is None or start is None else start + t,
+                run_deadline,
+            )
+            if d is not None
+        ]
+        return min(deadlines, default=None)
+
+    by_name = {check.name: check for check in checks}
+    deps = {
+        check: [by_name[d] for d in sorted(check.depends_on) if d in by_name]
+        for check in checks
+    }
+
     results: dict[Check, tuple[bool, str]] = {}
+    failed: set[Check] = set()
+    running: dict[Future[tuple[bool, str]], Check] = {}
+    pending: list[Check] = []
     for check in checks:
         if check in skip:
             print(f"   ⏭️  Skipped {check.name}")
-            continue
-        futures[check] = executor.submit(check.check)
-    for check, future in futures.items():
-        try:
-            results[check] = future.result()
-        except Exception as e:
-            results[check] = (False, f"Check threw a runtime exception: {e}")
-    return results
+            failed.add(check)
+        else:
+            pending.append(check)
+
+    def schedule() -> None:
+        changed = True
+        while changed:
+            changed = False
+            for check in tuple(pending):
+                blockers = [d.name for d in deps[check] if d in failed]
+                if blockers:
+                    results[check] = (
+                        False,
+                        f"Blocked by failing check(s): {', '.join(blockers)}",
+                    )
+                    failed.add(check)
+                elif not all(d in results for d in deps[check]):
+                    continue
+                elif check in cached:
+                    results[check] = (True, "")
+                elif not available(check):
+                    continue
+                else:
+                    for r in check.resources:
+                        in_use[r] = in_use.get(r, 0) + 1
+                    scopes[check] = proc.Scope()
+                    future = executor.submit(
+                        _run_check, check, scopes[check], started
+                    )
+                    running[future] = check
+                pending.remove(check)
+                changed = True
+
+    try:
+        schedule()
+        while running:
+            deadlines = [
+                d for d in map(deadline, running.values()) if d is not None
+            ]
+            finished, _ = wait(
+                running,
+                timeout=(
+                    max(min(deadlines) - time.monotonic(), 0)
+                    if deadlines
+                    else None
+                ),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in finished:
+                check = running.pop(future)
+                release(check)
+                try:
+                    results[check] = future.result()
+                except Exception as e:
+                    results[check] = (
+                        False,
+                        f"Check threw a runtime exception: {e}",
+                    )
+                if not results[check][0]:
+                    failed.add(check)
+
+            now = time.monotonic()
+            for future, check in tuple(running.items()):
+                d = deadline(check)
+                if d is not None and now >= d:
+                    # the check itself can't be stopped, but what it's
+                    # waiting on can
+                    del running[future]
+                    release(check)
+                    scopes[check].kill()
+                    start = started.get(check)
+                    if start is None:
+                        # still waiting for a thread
+                        future.cancel()
+                        results[check] = (
+                            False,
+                            "Check didn't run, doctor timed out",
+                        )
+                    else:
+                        results[check] = (
+                            False,
+                            f"Check timed out after {now - start:.1f}s",
+                        )
+                    failed.add(check)
+            if run_deadline is not None and now >= run_deadline:
+                for check in pending:
+                    results[check] = (
+                        False,
+                        "Check didn't run, doctor timed out",
+                    )
+                pending.clear()
+
+            schedule()
+    except BaseException:
+        # e.g. ctrl-c, which the subprocesses of running checks (being in
+        # their own process groups) didn't get
+        for scope in scopes.values():
+            scope.kill()
+        raise
+
+    # whatever's left depends on itself, one way or another
+    for check in pending:
+        results[check] = (False, "Check is part of a depends_on cycle")
+
+    return {check: results[check] for check in checks if check in results}
+
+
+def _run_check(
+    check: Check, scope: proc.Scope, started: dict[Check, float]
+) -> tuple[bool, str]:
+    started[check] = time.monotonic()
+    with scope:
+        return check.check()
+
+
+def cached_checks(checks: Iterable[Check]) -> list[Check]:
+    """The checks that passed recently enough (see Check.ttl)."""
+    return [c for c in checks if results_cache.fresh(c.key, c.digest, c.ttl)]
+
+
+def record_results(
+    results: Dict[Check, tuple[bool, str]], cached: Collection[Check] = ()
+) -> None:
+    """Remembers new passes of checks with a ttl, and forgets failures."""
+    results_cache.record(
+        passed=[
+            (check.key, check.digest)
+            for check, (ok, _) in results.items()
+            if ok and check.ttl > 0 and check not in cached
+        ],
+        failed=[check.key for check, (ok, _) in results.items() if not ok],
+    )
 
 
 def filter_failing_checks(
-    results: Dict[Check, tuple[bool, str]],
+    results: Dict[Check, tuple[bool, str]], cached: Collection[Check] = ()
 ) -> List[Check]:
     """Print a report of the results, and return a list of failing checks."""
     failing_checks: list[Check] = []
     for check, result in results.items():
         ok, msg = result
         if ok:
-            print(f"   ✅ check: {check.name}")
+            print(
+                f"   ✅ check: {check.name}{' (cached)' if check in cached else ''}"
+            )
             continue
         print(f"   ❌ check: {check.name}\n   {msg}")
         failing_checks.append(check)
@@ -185,7 +446,7 @@ def prompt_for_fix(check: Check) -> bool:
     ).lower() in {"y", "yes", ""}
 
 
-def attempt_fix(check: Check, executor: ThreadPoolExecutor) -> tuple[bool, str]:
+def attempt_fix(check: Check, executor: Executor) -> tuple[bool, str]:
     """Attempt to fix a check, and return a tuple of (ok, msg)."""
     future = executor.submit(check.fix)
     try:
@@ -211,6 +472,17 @@ def main(context: Context, argv: Sequence[str] | None = None) -> int:
     parser.add_argument(
         "--check-only", action="store_true", help="Do not run fixers."
     )
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Run every check, even ones that passed recently.",
+    )
+    cache_group.add_argument(
+        "--cached-only",
+        action="store_true",
+        help="Do not run any checks, only report recent results.",
+    )
     args = parser.parse_args(argv)
 
     match_tags: set[str] = set(args.tag if args.tag else ())
@@ -231,14 +503,48 @@ def main(context: Context, argv: Sequence[str] | None = None) -> int:
         print("No checks found.")
         return 1
 
-    # We run every check on a separate thread, aggregate the results,
-    # attempt any fixes, then recheck and provide a final report.
-    executor = ThreadPoolExecutor(max_workers=len(checks))
+    cached = [] if args.no_cache else cached_checks(checks)
+
+    if args.cached_only:
+        for check in checks:
+            if check in cached:
+                print(f"   ✅ check: {check.name} (cached)")
+            else:
+                print(f"   ❔ check: {check.name} (no recent result)")
+        return 0 if len(cached) == len(checks) else 1
+
+    cfg = config.get_global_config()
+    check_timeout = cfg.getfloat(
+        "doctor", "check_timeout", fallback=DEFAULT_CHECK_TIMEOUT
+    )
+    timeout = cfg.getfloat("doctor", "timeout", fallback=DEFAULT_TIMEOUT)
+    max_workers = cfg.getint(
+        "doctor", "max_workers", fallback=tasks.DEFAULT_MAX_WORKERS
+    )
+    if max_workers < 1:
+        raise SystemExit("[doctor] max_workers must be positive")
+    limits = dict(DEFAULT_LIMITS)
+    if cfg.has_section("doctor.limits"):
+        for r, limit in cfg.items("doctor.limits"):
+            limits[r] = int(limit)
+
+    # We run checks on (at most max_workers) threads, aggregate the
+    # results, attempt any fixes, then recheck and provide a final report.
+    executor = tasks.DaemonExecutor()
     print(f"Running checks: {', '.join(f'{c.name}' for c in checks)}")
 
-    results = run_checks(checks, executor)
+    results = run_checks(
+        checks,
+        executor,
+        cached=cached,
+        check_timeout=check_timeout,
+        timeout=timeout,
+        max_workers=max_workers,
+        limits=limits,
+    )
+    record_results(results, cached)
 
-    failing_checks = filter_failing_checks(results)
+    failing_checks = filter_failing_checks(results, cached)
 
     if not failing_checks:
         print("\nLooks good to me.")
@@ -249,8 +555,14 @@ def main(context: Context, argv: Sequence[str] | None = None) -> int:
             return 1
 
     skip: list[Check] = []
+    failing_names = {check.name for check in failing_checks}
     print("\nLet's go through the failures one by one.")
     for check in failing_checks:
+        blockers = check.depends_on & failing_names
+        if blockers:
+            # fixing those might be enough, the recheck will tell
+            print(f"⏭️  {check.name} (blocked by {', '.join(sorted(blockers))})")
+            continue
         print(f"❌ {check.name}")
         # Prompt for fixes one by one, so the user can decide to skip a fix.
         if prompt_for_fix(check):
@@ -265,7 +577,17 @@ def main(context: Context, argv: Sequence[str] | None = None) -> int:
 
     print("\nChecking that fixes worked as expected...")
     # re-run all checks since fixing one issue can cause another to fail
-    results = run_checks(checks, executor, skip=skip)
+    # (including cached ones)
+    results = run_checks(
+        checks,
+        executor,
+        skip=skip,
+        check_timeout=check_timeout,
+        timeout=timeout,
+        max_workers=max_workers,
+        limits=limits,
+    )
+    record_results(results)
 
     executor.shutdown()
 
@@ -1,18 +1,55 @@
 from __future__ import annotations
 
+import bz2
+import contextlib
+import errno
+import fcntl
+import fnmatch
+import gzip
 import hashlib
+import io
+import json
+import lzma
 import os
 import secrets
 import shutil
+import subprocess
 import tarfile
 import tempfile
+import threading
 import time
+import typing
 import urllib.request
 from collections.abc import Generator
-from collections.abc import Sequence
+from collections.abc import Iterable
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from http.client import HTTPException
 from urllib.error import HTTPError
+from urllib.error import URLError
 
-from devenv.constants import home
+from devenv.lib import cache
+from devenv.lib import config
+from devenv.lib import fs
+from devenv.lib import httppool
+from devenv.lib import mirror
+from devenv.lib import offline
+from devenv.lib import proc
+
+# large reads keep syscall and hashing overhead down for the 100+ MiB
+# tarballs we typically fetch (pythons, node, gcloud sdk)
+DEFAULT_BUFSIZE = 1024 * 1024
+
+# large artifacts are fetched over this many concurrent Range requests
+# (if the server supports it), but never in chunks smaller than min_chunk_size
+# configurable in the global config under [download] chunks, min_chunk_size
+DEFAULT_CHUNKS = 4
+DEFAULT_MIN_CHUNK_SIZE = 32 * 1024 * 1024
+
+
+class _Readable(typing.Protocol):
+    def read(self, size: int = -1, /) -> bytes: ...
 
 
 def atomic_replace(src: str, dest: str) -> None:
@@ -23,20 +60,50 @@ def atomic_replace(src: str, dest: str) -> None:
     os.replace(src, dest)
 
 
+def _headers(url: str) -> dict[str, str]:
+    headers = {}
+    if url.startswith("https://ghcr.io/v2/homebrew"):
+        # downloading homebrew blobs requires auth
+        # you can get an anonymous token from https://ghcr.io/token?service=ghcr.io&scope=repository%3Ahomebrew/core/go%3Apull
+        # but there's also a special shortcut token QQ==
+        # https://github.com/Homebrew/brew/blob/2184406bd8444e4de2626f5b0c749d4d08cb1aed/Library/Homebrew/brew.sh#L993
+        headers["Authorization"] = "bearer QQ=="
+    return headers
+
+
 def download(
     url: str,
     sha256: str,
     dest: str = "",
     retries: int = 3,
     retry_exp: float = 2.0,
+    bufsize: int = DEFAULT_BUFSIZE,
+    chunks: int | None = None,
+    min_chunk_size: int | None = None,
 ) -> str:
     if retries < 0:
         raise ValueError("Retries cannot be negative")
+    if bufsize <= 0:
+        raise ValueError("bufsize must be positive")
+
+    cfg = config.get_global_config()
+    if chunks is None:
+        chunks = cfg.getint("download", "chunks", fallback=DEFAULT_CHUNKS)
+    if min_chunk_size is None:
+        min_chunk_size = config.parse_size(
+            cfg.get(
+                "download",
+                "min_chunk_size",
+                fallback=f"{DEFAULT_MIN_CHUNK_SIZE}",
+            )
+        )
+    if min_chunk_size <= 0:
+        raise ValueError("min_chunk_size must be positive")
 
-    if not dest:
-        cache_root = f"{home}/.cache/sentry-devenv"
-        dest = f"{cache_root}/{sha256}"
-        os.makedirs(cache_root, exist_ok=True)
+    os.makedirs(cache.cache_root, exist_ok=True)
+    cached = not dest
+    if cached:
+        dest = cache.path(sha256)
 
     if os.path.islink(dest):
         # there are cases where dest can be an existing symlink
@@ -46,77 +113,616 @@ def download(
         os.remove(dest)
 
     if os.path.exists(dest):
+        if cached:
+            cache.touch(sha256)
         return dest
 
-    headers = {}
-    if url.startswith("https://ghcr.io/v2/homebrew"):
-        # downloading homebrew blobs requires auth
-        # you can get an anonymous token from https://ghcr.io/token?service=ghcr.io&scope=repository%3Ahomebrew/core/go%3Apull
-        # but there's also a special shortcut token QQ==
-        # https://github.com/Homebrew/brew/blob/2184406bd8444e4de2626f5b0c749d4d08cb1aed/Library/Homebrew/brew.sh#L993
-        headers["Authorization"] = "bearer QQ=="
-
-    req = urllib.request.Request(url, headers=headers)
+    if not cached and os.path.exists(cache.path(sha256)):
+        # it's been downloaded before, no need to do it again
+        cache.touch(sha256)
+        with (
+            open(cache.path(sha256), "rb") as src,
+            tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(dest), delete=False
+            ) as f,
+        ):
+            shutil.copyfileobj(src, f, bufsize)
+        atomic_replace(f.name, dest)
+        return dest
 
-    retry_sleep = 1.0
-    while retries >= 0:
-        try:
-            resp = urllib.request.urlopen(req)
-            break
-        except HTTPError as e:
-            if retries == 0:
-                raise RuntimeError(f"Error getting {url}: {e}")
-            print(f"Error getting {url} ({retries} retries left): {e}")
+    if offline.enabled:
+        raise offline.error(url, sha256)
 
-        time.sleep(retry_sleep)
-        retries -= 1
-        retry_sleep *= retry_exp
+    headers = _headers(url)
 
     dest_dir = os.path.dirname(dest)
     os.makedirs(dest_dir, exist_ok=True)
 
-    with tempfile.NamedTemporaryFile(delete=False, dir=dest_dir) as tmpf:
-        shutil.copyfileobj(resp, tmpf)
-        tmpf.seek(0)
-        checksum = hashlib.sha256()
-        buf = tmpf.read(4096)
-        while buf:
-            checksum.update(buf)
-            buf = tmpf.read(4096)
+    with _Partial(url, sha256) as partial:
+        # someone else might've finished it while we waited for the lock
+        if os.path.exists(dest):
+            partial.discard()
+            return dest
+
+        if _fetch_mirrors(url, sha256, dest, bufsize, chunks, min_chunk_size):
+            partial.discard()
+            if cached:
+                cache.record(sha256, url)
+            return dest
+
+        partial.resume(bufsize)
+
+        retry_sleep = 1.0
+        while True:
+            try:
+                partial.fetch(headers, bufsize, chunks, min_chunk_size)
+                break
+            except (
+                URLError,
+                HTTPException,
+                ConnectionError,
+                TimeoutError,
+            ) as e:
+                if retries == 0:
+                    raise RuntimeError(f"Error getting {url}: {e}")
+                print(f"Error getting {url} ({retries} retries left): {e}")
+
+            time.sleep(retry_sleep)
+            retries -= 1
+            retry_sleep *= retry_exp
 
-        if not secrets.compare_digest(checksum.hexdigest(), sha256):
-            raise RuntimeError(
-                f"checksum mismatch for {url}:\n"
-                f"- got: {checksum.hexdigest()}\n"
-                f"- expected: {sha256}\n"
-            )
+        try:
+            verify(url, partial.checksum, sha256)
+        except RuntimeError:
+            partial.discard()
+            raise
 
-        atomic_replace(tmpf.name, dest)
+        partial.finish(dest, bufsize)
+
+    if cached:
+        cache.record(sha256, url)
 
     return dest
 
 
-# strips the leading component unconditionally (like GNU tar)
+def _fetch_mirrors(
+    url: str,
+    sha256: str,
+    dest: str,
+    bufsize: int,
+    chunks: int,
+    min_chunk_size: int,
+) -> bool:
+    """
+    Tries getting url from its mirrors (see mirror.urls) into dest, giving
+    each one shot with a short timeout, since the checksum says whether
+    it worked anyway. Returns whether one did.
+
+    This uses its own partial so that whatever's left of an interrupted
+    download from url itself can still be resumed afterwards. A mirror
+    that can't be reached isn't tried again by this process.
+    """
+    candidates = mirror.urls(url, sha256)
+    if not candidates:
+        return False
+
+    timeout = mirror.timeout()
+    with _Partial(
+        candidates[0], sha256, suffix=".mirror.partial", timeout=timeout
+    ) as partial:
+        for mirror_url in candidates:
+            partial.url = mirror_url
+            partial.resume(bufsize)
+            try:
+                partial.fetch(
+                    _headers(mirror_url), bufsize, chunks, min_chunk_size
+                )
+            except HTTPError as e:
+                print(
+                    f"Error getting {url} from {mirror_url}, skipping it: {e}"
+                )
+                continue
+            except (
+                URLError,
+                HTTPException,
+                ConnectionError,
+                TimeoutError,
+            ) as e:
+                print(
+                    f"Error getting {url} from {mirror_url}, skipping it: {e}"
+                )
+                mirror.unreachable(mirror_url)
+                continue
+
+            if not secrets.compare_digest(partial.checksum.hexdigest(), sha256):
+                print(f"{mirror_url} doesn't match {sha256}, skipping it")
+                partial.reset("")
+                continue
+
+            partial.finish(dest, bufsize)
+            return True
+
+    return False
+
+
+def _validator(headers: Message) -> str:
+    # If-Range only accepts strong etags
+    etag = headers.get("ETag", "")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified", "")
+
+
+class _Partial:
+    """
+    An in-progress download of sha256 in the cache, which survives
+    interruptions so that the next attempt can pick up where it left off.
+
+    The data lives in {sha256}.partial, and {sha256}.partial.json records
+    the url and validator (ETag or Last-Modified) it came from so that a
+    resumed Range request can be guarded with If-Range. (Downloads from
+    mirrors use a different suffix, so they don't clobber that.)
+
+    The file is flock'd for as long as this is open, so concurrent devenvs
+    downloading the same thing wait on each other rather than interleave.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        sha256: str,
+        suffix: str = ".partial",
+        timeout: float | None = None,
+    ) -> None:
+        self.url = url
+        self.path = f"{cache.path(sha256)}{suffix}"
+        # seconds, for connecting and every read (None blocks)
+        self.timeout = timeout
+        self.meta_path = f"{self.path}.json"
+        self.validator = ""
+        self.checksum = hashlib.sha256()
+        self.size = 0
+
+        while True:
+            self.f = open(self.path, "ab+")
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+            # if the previous holder finished (and renamed it away)
+            # while we were waiting, we're locking a stale inode
+            try:
+                if os.path.samestat(
+                    os.fstat(self.f.fileno()), os.stat(self.path)
+                ):
+                    break
+            except FileNotFoundError:
+                pass
+            self.f.close()
+
+    def __enter__(self) -> _Partial:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.f.close()
+
+    def resume(self, bufsize: int) -> None:
+        """
+        Picks up whatever previous attempts left behind.
+        sha256 state can't be persisted, so the existing bytes are hashed once
+        here (rather than the whole file after the download completes).
+        """
+        try:
+            with open(self.meta_path) as f:
+                meta: dict[str, str] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            meta = {}
+
+        if meta.get("url") != self.url:
+            self.reset("")
+            return
+
+        self.validator = meta.get("validator", "")
+        self.rehash(bufsize)
+
+    def rehash(self, bufsize: int) -> None:
+        self.checksum = hashlib.sha256()
+        self.size = 0
+        self.f.seek(0)
+        buf = memoryview(bytearray(bufsize))
+        while n := self.f.readinto(buf):
+            self.checksum.update(buf[:n])
+            self.size += n
+
+    def reset(self, validator: str) -> None:
+        self.f.truncate(0)
+        self.checksum = hashlib.sha256()
+        self.size = 0
+        self.validator = validator
+        with open(self.meta_path, "w") as f:
+            json.dump({"url": self.url, "validator": validator}, f)
+
+    def fetch(
+        self,
+        headers: dict[str, str],
+        bufsize: int,
+        chunks: int = 1,
+        min_chunk_size: int = DEFAULT_MIN_CHUNK_SIZE,
+    ) -> None:
+        req_headers = dict(headers)
+        if self.size:
+            req_headers["Range"] = f"bytes={self.size}-"
+            if self.validator:
+                req_headers["If-Range"] = self.validator
+
+        req = urllib.request.Request(self.url, headers=req_headers)
+        try:
+            resp = httppool.urlopen(req, self.timeout)
+        except HTTPError as e:
+            if self.size and e.code == 416:
+                # we already have everything (the checksum will tell)
+                return
+            raise
+
+        with resp:
+            if not self.size or resp.status != 206:
+                # fresh download, or the server ignored our Range
+                # (or the If-Range validator didn't match)
+                self.reset(_validator(resp.headers))
+
+                length = int(resp.headers.get("Content-Length") or 0)
+                n = min(chunks, length // min_chunk_size)
+                if n > 1 and resp.headers.get("Accept-Ranges") == "bytes":
+                    self.fetch_parallel(resp, headers, length, n, bufsize)
+                    return
+
+            try:
+                copy_and_hash(resp, self.f, self.checksum, bufsize)
+            finally:
+                # everything written has been hashed and vice versa,
+                # so an interrupted copy can be resumed from here
+                self.f.flush()
+                self.size = self.f.tell()
+
+    def fetch_parallel(
+        self,
+        resp: io.BufferedIOBase,
+        headers: dict[str, str],
+        length: int,
+        n: int,
+        bufsize: int,
+    ) -> None:
+        """
+        Splits the download into n segments, each fetched over its own
+        connection and pwrite'd into place in the preallocated partial.
+        The first segment reuses resp, which is already streaming from 0.
+
+        Segments complete out of order so the result has to be hashed
+        afterwards in one pass. If anything fails, the contiguous head
+        written by the first segment is kept so a serial retry can resume.
+        """
+        bounds = [length * i // n for i in range(n + 1)]
+        written = [0] * n
+
+        range_headers = dict(headers)
+        if self.validator:
+            range_headers["If-Range"] = self.validator
+
+        def segment(i: int) -> None:
+            start, end = bounds[i], bounds[i + 1]
+            if i == 0:
+                _pwrite_range(resp, fd, start, end, bufsize, written, i)
+                return
+
+            req = urllib.request.Request(
+                self.url,
+                headers={**range_headers, "Range": f"bytes={start}-{end - 1}"},
+            )
+            with httppool.urlopen(req, self.timeout) as r:
+                if r.status != 206:
+                    raise HTTPException(
+                        f"server didn't honor Range: bytes={start}-{end - 1}"
+                    )
+                _pwrite_range(r, fd, start, end, bufsize, written, i)
+
+        # the partial is opened for appending which doesn't mix with pwrite
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            os.ftruncate(fd, length)
+            with ThreadPoolExecutor(max_workers=n) as executor:
+                for future in [executor.submit(segment, i) for i in range(n)]:
+                    future.result()
+        except BaseException:
+            os.ftruncate(fd, written[0])
+            raise
+        finally:
+            os.close(fd)
+            self.rehash(bufsize)
+
+    def discard(self) -> None:
+        for fp in (self.path, self.meta_path):
+            try:
+                os.remove(fp)
+            except FileNotFoundError:
+                pass
+
+    def finish(self, dest: str, bufsize: int) -> None:
+        self.f.flush()
+        try:
+            os.replace(self.path, dest)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # dest is on another filesystem, so copy it next to dest
+            # first in order to still be able to atomically move it in
+            with tempfile.NamedTemporaryFile(
+                delete=False, dir=os.path.dirname(dest)
+            ) as tmpf:
+                self.f.seek(0)
+                shutil.copyfileobj(self.f, tmpf, bufsize)
+            atomic_replace(tmpf.name, dest)
+        self.discard()
+
+
+def copy_and_hash(
+    src: io.BufferedIOBase,
+    dst: typing.IO[bytes],
+    checksum: hashlib._Hash,
+    bufsize: int = DEFAULT_BUFSIZE,
+) -> int:
+    """
+    Copies src to dst while feeding every chunk to checksum, so the
+    written file never has to be read back to be verified.
+    Returns the number of bytes copied.
+    """
+    buf = memoryview(bytearray(bufsize))
+    total = 0
+    while True:
+        n = src.readinto(buf)
+        if not n:
+            return total
+        chunk = buf[:n]
+        dst.write(chunk)
+        checksum.update(chunk)
+        total += n
+
+
+def _pwrite_range(
+    src: io.BufferedIOBase,
+    fd: int,
+    start: int,
+    end: int,
+    bufsize: int,
+    written: list[int],
+    i: int,
+) -> None:
+    """
+    pwrites src into fd at [start, end), tracking progress in written[i].
+    """
+    buf = memoryview(bytearray(bufsize))
+    offset = start
+    while offset < end:
+        n = src.readinto(buf[: min(bufsize, end - offset)])
+        if not n:
+            raise HTTPException(
+                f"connection closed early ({offset - start} of {end - start} bytes)"
+            )
+        chunk = buf[:n]
+        while chunk:
+            w = os.pwrite(fd, chunk, offset)
+            chunk = chunk[w:]
+            offset += w
+            written[i] += w
+
+
+def verify(url: str, checksum: hashlib._Hash, sha256: str) -> None:
+    if not secrets.compare_digest(checksum.hexdigest(), sha256):
+        raise RuntimeError(
+            f"checksum mismatch for {url}:\n"
+            f"- got: {checksum.hexdigest()}\n"
+            f"- expected: {sha256}\n"
+        )
+
+
+# the first bytes of an archive say how it's compressed
+_MAGIC = (
+    (b"\x1f\x8b", "gz"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zst"),
+    (b"BZh", "bz2"),
+)
+_MAGIC_LEN = max(len(magic) for magic, _ in _MAGIC)
+
+# external decompressors that are faster than (or, for zstd, missing from)
+# the stdlib, in order of preference; the first one that's installed is
+# piped through, otherwise tarfile decompresses by itself
+DECOMPRESSORS: dict[str, tuple[tuple[str, ...], ...]] = {
+    "gz": (("pigz", "-dc"),),
+    "xz": (("xz", "-dc", "-T0"),),
+    "zst": (("zstd", "-dc"),),
+}
+
+
+def _compression(head: bytes) -> str:
+    for magic, compression in _MAGIC:
+        if head.startswith(magic):
+            return compression
+    return ""
+
+
+def _decompressor(compression: str) -> tuple[str, ...] | None:
+    for cmd in DECOMPRESSORS.get(compression, ()):
+        exe = shutil.which(cmd[0], path=proc.base_path)
+        if exe is not None:
+            return (exe, *cmd[1:])
+    return None
+
+
+class _Prefixed:
+    """Puts back bytes that were already read from src."""
+
+    def __init__(self, head: bytes, src: _Readable) -> None:
+        self.head = head
+        self.src = src
+
+    def read(self, size: int = -1) -> bytes:
+        if size >= 0 and size <= len(self.head):
+            buf, self.head = self.head[:size], self.head[size:]
+            return buf
+        buf, self.head = self.head, b""
+        return buf + self.src.read(size - len(buf) if size >= 0 else -1)
+
+
+def _stdlib_decompressed(compression: str, src: _Readable) -> typing.IO[bytes]:
+    f = typing.cast(typing.IO[bytes], src)
+    if compression == "gz":
+        return typing.cast(typing.IO[bytes], gzip.GzipFile(fileobj=f))
+    if compression == "xz":
+        return typing.cast(typing.IO[bytes], lzma.LZMAFile(f))
+    if compression == "bz2":
+        return typing.cast(typing.IO[bytes], bz2.BZ2File(f))
+    return f
+
+
+@contextlib.contextmanager
+def _open_stream(
+    src: _Readable, bufsize: int = DEFAULT_BUFSIZE, whole: bool = True
+) -> Generator[tarfile.TarFile, None, None]:
+    """
+    Opens a (possibly compressed) tar stream for iterating through once,
+    decompressing it through one of DECOMPRESSORS if possible.
+
+    Unless whole is False (the caller may stop early), the caller must
+    read through to the end of the archive, after which a truncated
+    compressed stream raises EOFError (or tarfile.ReadError, if the
+    external decompressor failed).
+    """
+    head = src.read(_MAGIC_LEN)
+    compression = _compression(head)
+    cmd = _decompressor(compression)
+    if cmd is None:
+        if compression == "zst":
+            raise RuntimeError(
+                "zstd-compressed archives need zstd, run `brew install zstd`"
+            )
+        # tarfile's own r|* doesn't notice if the compressed stream ends
+        # early, the stdlib's file objects do once they're read to the end
+        decompressed = _stdlib_decompressed(compression, _Prefixed(head, src))
+        with tarfile.open(
+            fileobj=decompressed, mode="r|", bufsize=bufsize
+        ) as tarf:
+            yield tarf
+            if whole:
+                # whatever's after the end of the archive (padding)
+                while decompressed.read(bufsize):
+                    pass
+        return
+
+    p = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    assert p.stdin is not None and p.stdout is not None
+    stdin = p.stdin
+    stop = threading.Event()
+    feed_error: list[BaseException] = []
+
+    def feed() -> None:
+        try:
+            buf = head
+            while buf and not stop.is_set():
+                stdin.write(buf)
+                buf = src.read(bufsize)
+        except BrokenPipeError:
+            # the decompressor gave up, reading its output will tell why
+            pass
+        except BaseException as e:
+            feed_error.append(e)
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    killed = False
+    try:
+        with tarfile.open(fileobj=p.stdout, mode="r|", bufsize=bufsize) as tarf:
+            yield tarf
+            if whole:
+                # whatever's after the end of the archive (padding), then
+                # the decompressor exits by itself
+                while p.stdout.read(bufsize):
+                    pass
+                p.wait()
+    finally:
+        # whatever's left (e.g. once extract found what it wanted) isn't
+        # needed, and nothing's reading it anymore if something went wrong
+        stop.set()
+        p.stdout.close()
+        if p.poll() is None:
+            p.kill()
+            killed = True
+        feeder.join()
+        p.wait()
+
+        # if reading src failed, that's the actual problem
+        if feed_error:
+            raise feed_error[0]
+
+    # e.g. the archive was truncated, which only the decompressor noticed
+    if not killed and p.returncode:
+        raise tarfile.ReadError(
+            f"`{proc.quote(cmd)}` failed! (code {p.returncode})"
+        )
+
+
+# strips the leading components unconditionally (like GNU tar)
 # (/ is always stripped and doesn't count)
 # if there are conflicting filepaths after this, they'll error during unpack
-def strip1(
-    members: Sequence[tarfile.TarInfo],
-) -> Generator[tarfile.TarInfo, None, None]:
-    for member in members:
-        i = member.name.find("/")
+def _strip_n(name: str, n: int) -> str | None:
+    """Strips n leading components from name, None if it doesn't have that many."""
+    for _ in range(n):
+        i = name.find("/")
+        if i == 0:
+            i = name.find("/", 1)
         if i == -1:
-            continue
-        elif i == 0:
-            i = member.name[1:].find("/") + 1
-            if i == 0:
-                continue
+            return None
+        name = name[i + 1 :]  # noqa: E203
+    return name
 
-        member.name = member.name[i + 1 :]  # noqa: E203
+
+def _members(
+    tarf: tarfile.TarFile,
+    n: int = 0,
+    new_prefix: str = "",
+    include: Iterable[str] | None = None,
+) -> Generator[tarfile.TarInfo, None, None]:
+    """
+    Iterates once over a streamed (r|*) archive, renaming members as it
+    goes: n leading components are stripped (members with fewer are
+    skipped), then new_prefix is prepended. If include is given, only
+    members whose stripped names match one of its globs are yielded.
+    """
+    patterns = None if include is None else tuple(include)
+    while (member := tarf.next()) is not None:
+        # nothing can go back to previous members of a stream anyway,
+        # so there's no need to accumulate them (it's not in typeshed)
+        tarf.members.clear()  # type: ignore
+
+        name = _strip_n(member.name, n)
+        if name is None:
+            continue
+        if patterns is not None and not any(
+            fnmatch.fnmatchcase(name, p) for p in patterns
+        ):
+            continue
+        member.name = f"{new_prefix}/{name}" if new_prefix else name
 
         # hardlink target (linkname) is relative to the root of the
-        # archive and must also be stripped
+        # archive and must also be renamed
         if member.islnk():
-            member.linkname = member.linkname[i + 1 :]  # noqa: E203
+            linkname = _strip_n(member.linkname, n)
+            if linkname is None:
+                continue
+            member.linkname = (
+                f"{new_prefix}/{linkname}" if new_prefix else linkname
+            )
 
         yield member
 
@@ -126,30 +732,238 @@ def unpack(
     into: str,
     perform_strip1: bool = False,
     strip1_new_prefix: str = "",
+    include: Iterable[str] | None = None,
 ) -> None:
+    """
+    If include is given, only members whose (stripped) names match one of
+    its globs are extracted, e.g. include=("bin/*",).
+    """
+    unpack_strip_n(
+        path,
+        into,
+        n=1 if perform_strip1 else 0,
+        new_prefix=strip1_new_prefix,
+        include=include,
+    )
+
+
+def unpack_strip_n(
+    path: str,
+    into: str,
+    n: int,
+    new_prefix: str = "",
+    include: Iterable[str] | None = None,
+) -> None:
+    """
+    Like unpack, but strips n leading components. The archive is streamed
+    and extracted in a single pass.
+    """
     os.makedirs(into, exist_ok=True)
-    with tarfile.open(name=path, mode="r:*") as tarf:
-        members = tarf.getmembers()
-        if perform_strip1:
-            members = [_ for _ in strip1(members)]
-
-        if strip1_new_prefix:
-            for member in members:
-                member.name = f"{strip1_new_prefix}/{member.name}"
-
-        tarf.extractall(into, members=members, filter="tar")
-
-
-def unpack_strip_n(path: str, into: str, n: int, new_prefix: str = "") -> None:
-    os.makedirs(into, exist_ok=True)
-    with tarfile.open(name=path, mode="r:*") as tarf:
-        members = tarf.getmembers()
+    with open(path, "rb") as f, _open_stream(f) as tarf:
+        _extract_members(tarf, into, n, new_prefix, include)
 
-        for _ in range(n):
-            members = [_ for _ in strip1(members)]
 
-        if new_prefix:
-            for member in members:
-                member.name = f"{new_prefix}/{member.name}"
-
-        tarf.extractall(into, members=members, filter="tar")
+def _extract_members(
+    tarf: tarfile.TarFile,
+    into: str,
+    n: int = 0,
+    new_prefix: str = "",
+    include: Iterable[str] | None = None,
+) -> None:
+    directories: list[tarfile.TarInfo] = []
+    for member in _members(tarf, n, new_prefix, include):
+        if member.isdir():
+            # like extractall, set directory permissions last in case
+            # they wouldn't allow extracting anything into them
+            tarf.extract(member, into, set_attrs=False, filter="tar")
+            directories.append(tarfile.tar_filter(member, into))
+        else:
+            tarf.extract(member, into, filter="tar")
+
+    # deepest first, so that modifying their contents doesn't bump mtimes
+    for member in sorted(directories, key=lambda m: m.name, reverse=True):
+        dirpath = os.path.join(into, member.name)
+        os.chmod(dirpath, member.mode)
+        os.utime(dirpath, (member.mtime, member.mtime))
+
+
+def _extract_file(
+    tarf: tarfile.TarFile, member: tarfile.TarInfo, dest: str
+) -> None:
+    destdir = os.path.dirname(dest)
+    # the same safety checks extractall(filter="tar") does
+    member = tarfile.tar_filter(member, destdir)
+    src = tarf.extractfile(member)
+    if not member.isfile() or src is None:
+        raise RuntimeError(f"{member.name} isn't a regular file")
+
+    os.makedirs(destdir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=destdir, delete=False) as f:
+        try:
+            shutil.copyfileobj(src, f, DEFAULT_BUFSIZE)
+            os.chmod(f.name, member.mode)
+            os.utime(f.name, (member.mtime, member.mtime))
+        except BaseException:
+            os.remove(f.name)
+            raise
+    os.replace(f.name, dest)
+
+
+def extract(path: str, files: Mapping[str, str], n: int = 0) -> None:
+    """
+    Extracts just the regular files named in files (after stripping n
+    leading components) straight to their destinations, for example
+    {"bin/limactl": f"{binroot}/limactl"}. Each is atomically replaced.
+
+    The archive is read only up to the last of them, nothing else is
+    decompressed or written.
+    """
+    remaining = dict(files)
+    with open(path, "rb") as f, _open_stream(f, whole=False) as tarf:
+        for member in _members(tarf, n):
+            dest = remaining.pop(member.name, None)
+            if dest is None:
+                continue
+            _extract_file(tarf, member, dest)
+            if not remaining:
+                break
+
+    if remaining:
+        raise RuntimeError(f"{path} is missing {', '.join(sorted(remaining))}")
+
+
+class _Tee:
+    """
+    Reading from this reads from src, also hashing everything read and
+    writing it to dst.
+    """
+
+    def __init__(
+        self,
+        src: io.BufferedIOBase,
+        dst: typing.IO[bytes],
+        checksum: hashlib._Hash,
+    ) -> None:
+        self.src = src
+        self.dst = dst
+        self.checksum = checksum
+
+    def read(self, size: int = -1) -> bytes:
+        buf = self.src.read(size)
+        self.checksum.update(buf)
+        self.dst.write(buf)
+        return buf
+
+    def drain(self, bufsize: int) -> None:
+        while self.read(bufsize):
+            pass
+
+
+def _stream_unpack(
+    url: str, sha256: str, into: str, n: int, new_prefix: str, bufsize: int
+) -> None:
+    checksum = hashlib.sha256()
+    req = urllib.request.Request(url, headers=_headers(url))
+    with (
+        httppool.urlopen(req) as resp,
+        tempfile.NamedTemporaryFile(dir=cache.cache_root, delete=False) as f,
+    ):
+        try:
+            tee = _Tee(resp, f, checksum)
+            try:
+                with _open_stream(tee, bufsize) as tarf:
+                    _extract_members(tarf, into, n, new_prefix)
+            except (tarfile.TarError, EOFError):
+                # if it isn't what we expected at all, that's the better error
+                tee.drain(bufsize)
+                verify(url, checksum, sha256)
+                raise
+
+            # whatever follows the end of the archive (padding, compression
+            # trailers) is part of the checksum too
+            tee.drain(bufsize)
+            verify(url, checksum, sha256)
+        except BaseException:
+            os.remove(f.name)
+            raise
+
+    os.replace(f.name, cache.path(sha256))
+    cache.record(sha256, url)
+
+
+def download_and_unpack(
+    url: str,
+    sha256: str,
+    into: str,
+    n: int = 0,
+    new_prefix: str = "",
+    bufsize: int = DEFAULT_BUFSIZE,
+) -> None:
+    """
+    Downloads and unpacks (see unpack_strip_n) url into into, which must
+    not exist yet, at the same time: the response is hashed, saved to the
+    download cache, and extracted into a staging dir as it arrives. into
+    only appears once the checksum matches.
+
+    An archive that's already in the download cache is just unpacked.
+    If streaming fails partway, this falls back to download (which
+    retries and resumes) followed by unpacking.
+    """
+    os.makedirs(cache.cache_root, exist_ok=True)
+    parent = os.path.dirname(into)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent)
+    try:
+        os.chmod(staging, 0o755)
+        if os.path.exists(cache.path(sha256)):
+            cache.touch(sha256)
+            unpack_strip_n(cache.path(sha256), staging, n, new_prefix)
+        elif offline.enabled:
+            raise offline.error(url, sha256)
+        elif mirror.urls(url, sha256):
+            # download knows how to fall back from one mirror to the next,
+            # and mirrors tend to be close enough that streaming won't win much
+            archive_file = download(url, sha256, bufsize=bufsize)
+            unpack_strip_n(archive_file, staging, n, new_prefix)
+        else:
+            try:
+                _stream_unpack(url, sha256, staging, n, new_prefix, bufsize)
+            except (
+                URLError,
+                HTTPException,
+                ConnectionError,
+                TimeoutError,
+            ) as e:
+                print(f"Error getting {url}, retrying without streaming: {e}")
+                shutil.rmtree(staging)
+                os.mkdir(staging, 0o755)
+                archive_file = download(url, sha256, bufsize=bufsize)
+                unpack_strip_n(archive_file, staging, n, new_prefix)
+
+        os.replace(staging, into)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def unpack_cached(
+    url: str, sha256: str, into: str, n: int = 0, new_prefix: str = ""
+) -> None:
+    """
+    Like download_and_unpack, except the unpacked tree is kept in
+    the cache (keyed by sha256 and n) and cloned into place (see
+    fs.clone_tree), so installing the same archive again (say, node in
+    another worktree) doesn't download or extract anything, and takes
+    up no extra disk.
+    """
+    tree = cache.tree_path(sha256, n)
+    os.makedirs(os.path.dirname(tree), exist_ok=True)
+    with open(f"{tree}.lock", "a") as lockf:
+        fcntl.flock(lockf, fcntl.LOCK_EX)
+        if os.path.exists(tree):
+            cache.touch(sha256)
+        else:
+            download_and_unpack(url, sha256, tree, n)
+            cache.record_tree(sha256, tree)
+
+        fs.clone_tree(tree, f"{into}/{new_prefix}" if new_prefix else into)
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import fcntl
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import time
+from collections.abc import Generator
+from dataclasses import dataclass
+
+from devenv.constants import home
+from devenv.lib import config
+
+# content-addressed: every artifact lives at {cache_root}/{sha256}
+cache_root = f"{home}/.cache/sentry-devenv"
+
+# configurable in the global config under [cache] max_size
+DEFAULT_MAX_SIZE = "4G"
+
+_sha256_re = re.compile(r"^[0-9a-f]{64}$")
+_tree_re = re.compile(r"^([0-9a-f]{64})-\d+$")
+_partial_re = re.compile(r"^[0-9a-f]{64}(\.mirror)?\.partial$")
+
+
+@dataclass(frozen=True)
+class Entry:
+    size: int
+    # last access, as a unix timestamp
+    atime: float
+    # where it was originally downloaded from
+    url: str = ""
+    # bytes taken up by its unpacked trees (see tree_path)
+    trees: int = 0
+
+
+def path(sha256: str) -> str:
+    return f"{cache_root}/{sha256}"
+
+
+def tree_path(sha256: str, strip: int = 0) -> str:
+    """
+    Where archive.unpack_cached keeps sha256 unpacked (with strip leading
+    components removed). Trees are evicted along with their archive.
+    """
+    return f"{cache_root}/trees/{sha256}-{strip}"
+
+
+def _trees() -> list[tuple[str, str]]:
+    """The unpacked trees, as (sha256, tree path)."""
+    trees_root = f"{cache_root}/trees"
+    try:
+        names = os.listdir(trees_root)
+    except FileNotFoundError:
+        return []
+    # (lockfiles and unpacks in progress don't match)
+    return [
+        (m[1], f"{trees_root}/{name}")
+        for name in names
+        if (m := _tree_re.match(name))
+    ]
+
+
+def _tree_size(tree: str) -> int:
+    size = 0
+    for dirpath, _, filenames in os.walk(tree):
+        for name in filenames:
+            with contextlib.suppress(FileNotFoundError):
+                size += os.lstat(f"{dirpath}/{name}").st_size
+    return size
+
+
+def _remove_tree(tree: str) -> None:
+    """
+    Removes tree unless it's in use (being unpacked or cloned from), in
+    which case it's left for a later rescan to pick up. This mustn't wait
+    for the tree's lock: its holder may be waiting on the index.
+    """
+    # (the lockfile is left alone, someone else may have it open)
+    with open(f"{tree}.lock", "a") as lockf:
+        try:
+            fcntl.flock(lockf, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        shutil.rmtree(tree, ignore_errors=True)
+
+
+def _remove_trees(sha256: str) -> None:
+    for tree_sha256, tree in _trees():
+        if tree_sha256 == sha256:
+            _remove_tree(tree)
+
+
+def _partials() -> dict[str, os.stat_result]:
+    """Downloads in progress or abandoned (see archive._Partial), by path."""
+    partials: dict[str, os.stat_result] = {}
+    with os.scandir(cache_root) as it:
+        for de in it:
+            if _partial_re.match(de.name) and de.is_file(follow_symlinks=False):
+                partials[de.path] = de.stat(follow_symlinks=False)
+    return partials
+
+
+def _remove_partial(partial: str) -> bool:
+    """
+    Removes an abandoned partial download (and what's recorded about it),
+    returning False if it's still being downloaded into.
+    """
+    try:
+        f = open(partial, "rb")
+    except FileNotFoundError:
+        return True
+    with f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        # (whoever's waiting on this lock notices it's gone and starts over)
+        for fp in (partial, f"{partial}.json"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(fp)
+    return True
+
+
+def max_size() -> int:
+    cfg = config.get_global_config()
+    return config.parse_size(
+        cfg.get("cache", "max_size", fallback=DEFAULT_MAX_SIZE)
+    )
+
+
+@contextlib.contextmanager
+def _index() -> Generator[dict[str, Entry], None, None]:
+    """
+    Yields the (flock'd) index, which is written back on exit.
+    """
+    os.makedirs(cache_root, exist_ok=True)
+    with open(f"{cache_root}/index.json", "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        try:
+            raw: dict[str, dict[str, str | int | float]] = json.load(f)
+        except ValueError:
+            raw = {}
+
+        index: dict[str, Entry] = {}
+        for sha256, entry in raw.items():
+            try:
+                index[sha256] = Entry(
+                    size=int(entry["size"]),
+                    atime=float(entry["atime"]),
+                    url=str(entry.get("url", "")),
+                    trees=int(entry.get("trees", 0)),
+                )
+            except (KeyError, TypeError, ValueError):
+                # written by an incompatible devenv, it'll get rescanned
+                continue
+
+        yield index
+
+        f.seek(0)
+        f.truncate()
+        json.dump(
+            {sha256: dataclasses.asdict(e) for sha256, e in index.items()}, f
+        )
+
+
+def _rescan(index: dict[str, Entry]) -> None:
+    """
+    Reconciles the index with what's actually on disk, picking up anything
+    downloaded by older devenvs and forgetting anything deleted by hand.
+    Trees are remeasured, and removed if their archive is gone.
+    """
+    on_disk: dict[str, os.stat_result] = {}
+    with os.scandir(cache_root) as it:
+        for de in it:
+            if _sha256_re.match(de.name) and de.is_file(follow_symlinks=False):
+                on_disk[de.name] = de.stat(follow_symlinks=False)
+
+    tree_sizes: dict[str, int] = {}
+    for sha256, tree in _trees():
+        if sha256 in on_disk:
+            tree_sizes[sha256] = tree_sizes.get(sha256, 0) + _tree_size(tree)
+        else:
+            _remove_tree(tree)
+
+    for sha256 in index.keys() - on_disk.keys():
+        del index[sha256]
+
+    for sha256, st in on_disk.items():
+        entry = index.get(sha256) or Entry(size=st.st_size, atime=st.st_mtime)
+        index[sha256] = dataclasses.replace(
+            entry, trees=tree_sizes.get(sha256, 0)
+        )
+
+
+def _evict(index: dict[str, Entry], budget: int, keep: str = "") -> list[str]:
+    """
+    Evicts the least recently used entries until the cache fits budget.
+    Abandoned partial downloads count too, as of when they were last
+    written to, and are returned by file name.
+    """
+    partials = _partials()
+    candidates = [
+        (entry.atime, sha256, entry.size + entry.trees)
+        for sha256, entry in index.items()
+    ] + [(st.st_mtime, fp, st.st_size) for fp, st in partials.items()]
+    total = sum(size for _, _, size in candidates)
+
+    evicted: list[str] = []
+    for _, name, size in sorted(candidates):
+        if total <= budget:
+            break
+        if name == keep:
+            continue
+        if name in partials:
+            if not _remove_partial(name):
+                continue
+            evicted.append(os.path.basename(name))
+        else:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path(name))
+            _remove_trees(name)
+            del index[name]
+            evicted.append(name)
+        total -= size
+    return evicted
+
+
+def touch(sha256: str) -> None:
+    """Marks an entry as just used. This doesn't rehash anything."""
+    with _index() as index:
+        entry = index.get(sha256)
+        if entry is None:
+            try:
+                size = os.stat(path(sha256)).st_size
+            except FileNotFoundError:
+                return
+            entry = Entry(size=size, atime=0)
+        index[sha256] = dataclasses.replace(entry, atime=time.time())
+
+
+def record(sha256: str, url: str) -> None:
+    """Indexes a newly downloaded entry, then evicts down to the budget."""
+    size = os.stat(path(sha256)).st_size
+    with _index() as index:
+        index[sha256] = Entry(size=size, atime=time.time(), url=url)
+        for evicted in _evict(index, max_size(), keep=sha256):
+            print(f"evicted {evicted} from the download cache")
+
+
+def record_tree(sha256: str, tree: str) -> None:
+    """
+    Counts a newly unpacked tree of sha256 against the budget, then evicts
+    down to it.
+    """
+    size = _tree_size(tree)
+    with _index() as index:
+        entry = index.get(sha256)
+        if entry is None:
+            # its archive isn't indexed (yet), the next rescan measures it
+            return
+        index[sha256] = dataclasses.replace(entry, trees=entry.trees + size)
+        for evicted in _evict(index, max_size(), keep=sha256):
+            print(f"evicted {evicted} from the download cache")
+
+
+def entries() -> dict[str, Entry]:
+    with _index() as index:
+        _rescan(index)
+        return dict(index)
+
+
+def prune(budget: int | None = None) -> list[str]:
+    """Evicts down to budget (default: the configured max_size)."""
+    if budget is None:
+        budget = max_size()
+    with _index() as index:
+        _rescan(index)
+        return _evict(index, budget)
+
+
+def verify() -> list[str]:
+    """Rehashes every entry, removing (and returning) corrupt ones."""
+    corrupt: list[str] = []
+    with _index() as index:
+        _rescan(index)
+        for sha256 in list(index):
+            checksum = hashlib.sha256()
+            with open(path(sha256), "rb") as f:
+                while buf := f.read(1024 * 1024):
+                    checksum.update(buf)
+            if not secrets.compare_digest(checksum.hexdigest(), sha256):
+                os.remove(path(sha256))
+                _remove_trees(sha256)
+                del index[sha256]
+                corrupt.append(sha256)
+    return corrupt
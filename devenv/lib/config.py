@@ -10,6 +10,7 @@ from typing import TypeAlias
 
 from devenv.constants import CI
 from devenv.constants import MACHINE
+from devenv.constants import home
 
 
 @dataclass(frozen=True)
@@ -35,6 +36,10 @@ CONFIG_OPTS = {
 
 Config: TypeAlias = "dict[str, dict[str, str | None]]"
 
+global_config_path = f"{home}/.config/sentry-devenv/config.ini"
+
+_size_units = {"k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
 
 def initialize_config(config_path: str, defaults: Config) -> None:
     config = configparser.ConfigParser()
@@ -99,6 +104,19 @@ def get_config(path: str) -> configparser.ConfigParser:
     return config
 
 
+def get_global_config() -> configparser.ConfigParser:
+    """Reads the global configuration, with caching"""
+    return get_config(global_config_path)
+
+
+def parse_size(s: str) -> int:
+    """Parses a size in bytes, optionally suffixed with K, M, G or T (base 1024)"""
+    s = s.strip().lower().removesuffix("b").removesuffix("i")
+    if s and s[-1] in _size_units:
+        return int(float(s[:-1]) * _size_units[s[-1]])
+    return int(s)
+
+
 def get_repo(reporoot: str) -> configparser.ConfigParser:
     """Deprecated"""
     from devenv.lib.repository import Repository
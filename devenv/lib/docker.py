@@ -4,7 +4,6 @@ import os
 import shutil
 import socket
 import subprocess
-import tempfile
 from threading import Thread
 
 from devenv.constants import SYSTEM_MACHINE
@@ -70,14 +69,8 @@ def uninstall(binroot: str) -> None:
 
 
 def _install(url: str, sha256: str, into: str) -> None:
-    os.makedirs(into, exist_ok=True)
-    with tempfile.TemporaryDirectory(dir=into) as tmpd:
-        archive_file = archive.download(url, sha256, dest=f"{tmpd}/download")
-        archive.unpack_strip_n(archive_file, tmpd, n=1)
-
-        # the archive was atomically placed into tmpd so
-        # these are on the same fs and can be atomically moved too
-        os.replace(f"{tmpd}/docker", f"{into}/docker")
+    archive_file = archive.download(url, sha256)
+    archive.extract(archive_file, {"docker": f"{into}/docker"}, n=1)
 
 
 def _install_buildx(url: str, sha256: str, into: str) -> None:
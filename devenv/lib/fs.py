@@ -2,9 +2,12 @@ from __future__ import annotations
 
 import os
 import shlex
+import shutil
+import stat
 import subprocess
 from typing import Optional
 
+from devenv.constants import DARWIN
 from devenv.constants import home
 from devenv.constants import shell
 from devenv.lib import proc
@@ -35,19 +38,81 @@ def shellrc() -> str:
     raise NotImplementedError(f"unsupported shell: {shell}")
 
 
-def gitroot(cd: str = "") -> str:
+# these change where git looks for the repository, so they're left to it
+_GIT_DISCOVERY_ENV = (
+    "GIT_DIR",
+    "GIT_WORK_TREE",
+    "GIT_CEILING_DIRECTORIES",
+    "GIT_DISCOVERY_ACROSS_FILESYSTEM",
+)
+
+
+def _find_gitroot(cd: str) -> str | None:
+    """
+    Walks up from cd to the first directory with a .git, which is either
+    the git dir itself or (for worktrees and submodules) a gitfile pointing
+    to it. Returns None if there isn't one or anything looks unusual, in
+    which case git should decide.
+    """
+    d = os.path.abspath(cd)
+    if ".git" in d.split(os.sep):
+        # somewhere inside a git dir
+        return None
+
+    while True:
+        dotgit = os.path.join(d, ".git")
+        try:
+            st = os.stat(dotgit)
+        except OSError:
+            parent = os.path.dirname(d)
+            if parent == d:
+                return None
+            d = parent
+            continue
+
+        if stat.S_ISDIR(st.st_mode):
+            return d if os.path.exists(f"{dotgit}/HEAD") else None
+
+        try:
+            with open(dotgit) as f:
+                line = f.readline()
+        except OSError:
+            return None
+        if not line.startswith("gitdir: "):
+            return None
+        gitdir = os.path.join(d, line.removeprefix("gitdir: ").strip())
+        return d if os.path.isdir(gitdir) else None
+
+
+def _git_gitroot(cd: str) -> str:
     from os.path import join
     from os.path import normpath
 
-    if not cd:
-        cd = os.getcwd()
-
     stdout = proc.run(
         ("git", "-C", cd, "rev-parse", "--show-cdup"), stdout=True
     )
     return normpath(join(cd, stdout))
 
 
+def gitroot(cd: str = "") -> str:
+    """
+    The root of the git worktree cd (default: the cwd) is in.
+    Raises RuntimeError if it isn't in one.
+
+    This runs on every devenv invocation, so the common cases are found
+    without spawning git, which is only asked when they don't apply.
+    """
+    if not cd:
+        cd = os.getcwd()
+
+    if not any(os.getenv(var) for var in _GIT_DISCOVERY_ENV):
+        root = _find_gitroot(cd)
+        if root is not None:
+            return root
+
+    return _git_gitroot(cd)
+
+
 def idempotent_add(filepath: str, text: str) -> None:
     if not os.path.exists(filepath):
         with open(filepath, "w") as f:
@@ -93,3 +158,35 @@ def ensure_symlink(expected_src: str, dest: str) -> None:
         if e.errno == 22:
             print(f"WARNING: {dest} exists and isn't a symlink")
             return
+
+
+def _link_or_copy(src: str, dest: str) -> None:
+    try:
+        os.link(src, dest)
+    except OSError:
+        # e.g. src is on a different filesystem
+        shutil.copy2(src, dest)
+
+
+def clone_tree(src: str, dest: str) -> None:
+    """
+    Copies the contents of src into dest (which may already exist) without
+    copying any data where possible: copy-on-write clones on APFS,
+    otherwise hardlinks. Files in dest must therefore be replaced rather
+    than written into, or src changes with them.
+    """
+    os.makedirs(dest, exist_ok=True)
+    if DARWIN:
+        try:
+            proc.run(("cp", "-c", "-R", f"{src}/.", dest))
+            return
+        except RuntimeError:
+            pass
+
+    shutil.copytree(
+        src,
+        dest,
+        symlinks=True,
+        copy_function=_link_or_copy,
+        dirs_exist_ok=True,
+    )
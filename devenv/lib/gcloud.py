@@ -13,11 +13,9 @@ from devenv.lib import proc
 def _install(url: str, sha256: str, into: str) -> None:
     os.makedirs(into, exist_ok=True)
     with tempfile.TemporaryDirectory(dir=into) as tmpd:
-        archive_file = archive.download(url, sha256, dest=f"{tmpd}/download")
-        archive.unpack(archive_file, tmpd)
+        archive.unpack_cached(url, sha256, tmpd)
 
-        # the archive was atomically placed into tmpd so
-        # these are on the same fs and can be atomically moved too
+        # tmpd is inside into so this can be atomically moved
         os.replace(f"{tmpd}/google-cloud-sdk", f"{into}/google-cloud-sdk")
 
     # I think gcloud will support 3.11 for quite some time, but this could
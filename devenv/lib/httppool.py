@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import http.client
+import socket
+import threading
+import urllib.request
+from collections.abc import Callable
+from functools import partial
+from urllib.error import URLError
+
+# idle connections kept per host
+MAX_IDLE = 4
+
+_Connection = http.client.HTTPConnection
+_Key = tuple[str, str]
+
+
+class _Response(http.client.HTTPResponse):
+    # called once this is closed, with whether its connection can be reused
+    on_close: Callable[[bool], None] | None = None
+
+    def close(self) -> None:
+        # unless the body was read to the end (at which point http.client
+        # already considers this closed), the rest is still in the connection
+        reusable = self.isclosed() and not self.will_close
+        super().close()
+        if self.on_close is not None:
+            on_close, self.on_close = self.on_close, None
+            on_close(reusable)
+
+
+class _HTTPConnection(http.client.HTTPConnection):
+    response_class = _Response
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    response_class = _Response
+
+
+class _Pool:
+    def __init__(self, max_idle: int = MAX_IDLE) -> None:
+        self.max_idle = max_idle
+        self.lock = threading.Lock()
+        self.idle: dict[_Key, list[_Connection]] = {}
+
+    def get(self, key: _Key) -> _Connection | None:
+        with self.lock:
+            idle = self.idle.get(key)
+            if idle:
+                return idle.pop()
+        return None
+
+    def put(self, key: _Key, conn: _Connection, reusable: bool) -> None:
+        if reusable:
+            with self.lock:
+                idle = self.idle.setdefault(key, [])
+                if len(idle) < self.max_idle:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def clear(self) -> None:
+        with self.lock:
+            for idle in self.idle.values():
+                for conn in idle:
+                    conn.close()
+            self.idle.clear()
+
+
+class _KeepAliveHandler(
+    urllib.request.HTTPHandler, urllib.request.HTTPSHandler
+):
+    """
+    Like the default http(s) handlers, except connections are kept alive
+    and reused (AbstractHTTPHandler.do_open always sends Connection: close).
+    Everything else (redirects, errors) is handled by the rest of the
+    opener as usual.
+    """
+
+    def __init__(self, pool: _Pool) -> None:
+        urllib.request.HTTPHandler.__init__(self)
+        urllib.request.HTTPSHandler.__init__(self)
+        self.pool = pool
+
+    def http_open(
+        self, req: urllib.request.Request
+    ) -> http.client.HTTPResponse:
+        return self._open(req, "http")
+
+    def https_open(
+        self, req: urllib.request.Request
+    ) -> http.client.HTTPResponse:
+        return self._open(req, "https")
+
+    def _open(
+        self, req: urllib.request.Request, scheme: str
+    ) -> http.client.HTTPResponse:
+        if not req.host:
+            raise URLError("no host given")
+        key = (scheme, req.host)
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update(
+            {k: v for k, v in req.headers.items() if k not in headers}
+        )
+        headers = {k.title(): v for k, v in headers.items()}
+
+        while True:
+            conn = self.pool.get(key)
+            reused = conn is not None
+            if conn is None:
+                conn_class = (
+                    _HTTPSConnection if scheme == "https" else _HTTPConnection
+                )
+                conn = conn_class(req.host, timeout=req.timeout)
+            else:
+                # the timeout is per request, not per connection
+                timeout = req.timeout
+                if not isinstance(timeout, (int, float)):
+                    timeout = socket.getdefaulttimeout()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+
+            try:
+                conn.request(req.get_method(), req.selector, req.data, headers)
+                resp = conn.getresponse()
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                if reused:
+                    # the server probably timed out the idle connection
+                    continue
+                raise URLError(e)
+            break
+
+        assert isinstance(resp, _Response)
+        resp.on_close = partial(self.pool.put, key, conn)
+        # what urllib's own handlers set, for HTTPErrorProcessor
+        resp.url = req.get_full_url()
+        resp.msg = resp.reason  # type: ignore
+        return resp
+
+
+_lock = threading.Lock()
+_pool = _Pool()
+_opener: urllib.request.OpenerDirector | None = None
+
+
+def _get_opener() -> urllib.request.OpenerDirector:
+    global _opener
+    with _lock:
+        if _opener is None:
+            if urllib.request.getproxies():
+                # the default handlers know how to tunnel through those
+                _opener = urllib.request.build_opener()
+            else:
+                _opener = urllib.request.build_opener(_KeepAliveHandler(_pool))
+        return _opener
+
+
+def urlopen(
+    req: urllib.request.Request, timeout: float | None = None
+) -> http.client.HTTPResponse:
+    """
+    Like urllib.request.urlopen, except connections are kept alive and
+    shared by every request to the same host in this process.
+    A connection is reused once its response is read to the end and closed.
+
+    timeout (in seconds) applies to connecting and to every read, and
+    defaults to socket.getdefaulttimeout() (blocking, unless set).
+    """
+    opener = _get_opener()
+    if timeout is None:
+        resp: http.client.HTTPResponse = opener.open(req)
+    else:
+        resp = opener.open(req, timeout=timeout)
+    return resp
+
+
+def clear() -> None:
+    """Closes idle connections."""
+    _pool.clear()
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import os
 import shutil
-import tempfile
 
 from devenv.constants import SYSTEM_MACHINE
 from devenv.constants import home
@@ -32,30 +31,20 @@ def uninstall(binroot: str) -> None:
 
 
 def _install(url: str, sha256: str, into: str) -> None:
-    os.makedirs(into, exist_ok=True)
-    with tempfile.TemporaryDirectory(dir=into) as tmpd:
-        archive_file = archive.download(url, sha256, dest=f"{tmpd}/download")
-
-        # the archive from homebrew has a lima/version prefix
-        archive.unpack_strip_n(archive_file, tmpd, n=2)
-
-        # the archive was atomically placed into tmpd so
-        # these are on the same fs and can be atomically moved too
-        os.replace(f"{tmpd}/bin/lima", f"{into}/lima")
-        os.replace(f"{tmpd}/bin/limactl", f"{into}/limactl")
-        os.replace(
-            f"{tmpd}/share/lima/lima-guestagent.Linux-aarch64",
-            f"{into}/lima-guestagent.Linux-aarch64",
-        )
-        os.replace(
-            f"{tmpd}/share/lima/lima-guestagent.Linux-x86_64",
-            f"{into}/lima-guestagent.Linux-x86_64",
-        )
-        os.makedirs(f"{into}/templates", exist_ok=True)
-        os.replace(
-            f"{tmpd}/share/lima/templates/default.yaml",
-            f"{into}/templates/default.yaml",
-        )
+    archive_file = archive.download(url, sha256)
+
+    # the archive from homebrew has a lima/version prefix
+    archive.extract(
+        archive_file,
+        {
+            "bin/lima": f"{into}/lima",
+            "bin/limactl": f"{into}/limactl",
+            "share/lima/lima-guestagent.Linux-aarch64": f"{into}/lima-guestagent.Linux-aarch64",
+            "share/lima/lima-guestagent.Linux-x86_64": f"{into}/lima-guestagent.Linux-x86_64",
+            "share/lima/templates/default.yaml": f"{into}/templates/default.yaml",
+        },
+        n=2,
+    )
 
 
 def install_global() -> None:
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import os
+import re
+import urllib.parse
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+from devenv.lib import cache
+from devenv.lib import config
+
+DEFAULT_PORT = 8750
+# seconds to wait on a mirror (connecting, or for data) before moving on
+DEFAULT_TIMEOUT = 5.0
+
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+# hosts that couldn't be reached, which this process doesn't try again
+_unreachable: set[str] = set()
+
+
+def _lines(value: str) -> list[str]:
+    return [line.strip() for line in value.splitlines() if line.strip()]
+
+
+def rewrites() -> list[tuple[str, str]]:
+    """
+    The [mirror] rewrite url prefix mappings from the global config, one
+    "prefix replacement" per line.
+    """
+    cfg = config.get_global_config()
+    mappings = []
+    for line in _lines(cfg.get("mirror", "rewrite", fallback="")):
+        prefix, _, replacement = line.partition(" ")
+        if not replacement.strip():
+            raise ValueError(
+                f"[mirror] rewrite needs a prefix and a replacement, got: {line}"
+            )
+        mappings.append((prefix, replacement.strip()))
+    return mappings
+
+
+def mirrors() -> list[str]:
+    """
+    The [mirror] mirrors from the global config, one base url per line.
+    These are content-addressed, i.e. serve {mirror}/{sha256} (like
+    `devenv mirror serve` does).
+    """
+    cfg = config.get_global_config()
+    return [
+        m.rstrip("/") for m in _lines(cfg.get("mirror", "mirrors", fallback=""))
+    ]
+
+
+def timeout() -> float:
+    """The [mirror] timeout from the global config, in seconds."""
+    cfg = config.get_global_config()
+    return cfg.getfloat("mirror", "timeout", fallback=DEFAULT_TIMEOUT)
+
+
+def unreachable(url: str) -> None:
+    """Skips url's host in urls() for the rest of this process."""
+    _unreachable.add(urllib.parse.urlsplit(url).netloc)
+
+
+def urls(url: str, sha256: str) -> list[str]:
+    """
+    Where to try getting url from before url itself, in order: the first
+    matching rewrite, then every mirror (leaving out unreachable hosts).
+    Since whatever's downloaded is checked against sha256 anyway, none of
+    them need to be trusted.
+    """
+    candidates = []
+    for prefix, replacement in rewrites():
+        if url.startswith(prefix):
+            candidates.append(f"{replacement}{url[len(prefix) :]}")
+            break
+    candidates.extend(f"{m}/{sha256}" for m in mirrors())
+    return [
+        c
+        for c in candidates
+        if urllib.parse.urlsplit(c).netloc not in _unreachable
+    ]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    Serves GET /{sha256} from the download cache, with Range support so
+    that downloads from it can be resumed and split into chunks.
+    """
+
+    # keep-alive
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self) -> None:
+        self._serve(body=False)
+
+    def do_GET(self) -> None:
+        self._serve(body=True)
+
+    def _serve(self, body: bool) -> None:
+        sha256 = self.path.split("?", 1)[0].strip("/")
+        if not _SHA256.fullmatch(sha256):
+            self.send_error(404)
+            return
+        try:
+            f = open(cache.path(sha256), "rb")
+        except FileNotFoundError:
+            self.send_error(404)
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            etag = f'"{sha256}"'
+            start, end = 0, size
+
+            m = _RANGE.fullmatch(self.headers.get("Range", ""))
+            if m and self.headers.get("If-Range", etag) == etag:
+                first, last = m.groups()
+                if first:
+                    start = int(first)
+                    if last:
+                        end = min(int(last) + 1, size)
+                elif last:
+                    # the last n bytes
+                    start = max(size - int(last), 0)
+
+                if start >= end:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(206)
+                self.send_header(
+                    "Content-Range", f"bytes {start}-{end - 1}/{size}"
+                )
+            else:
+                self.send_response(200)
+
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", f"{end - start}")
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.end_headers()
+
+            if start == 0:
+                cache.touch(sha256)
+            if body and end > start:
+                self.connection.sendfile(f, start, end - start)
+
+
+def server(host: str = "", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """A server for the download cache (see _Handler), not yet started."""
+    return ThreadingHTTPServer((host, port), _Handler)
@@ -8,6 +8,7 @@ import tempfile
 from devenv.lib import archive
 from devenv.lib import fs
 from devenv.lib import proc
+from devenv.lib import state
 
 _shims = ("node", "npm", "npx")
 
@@ -15,17 +16,10 @@ _shims = ("node", "npm", "npx")
 def _install(url: str, sha256: str, into: str) -> None:
     os.makedirs(into, exist_ok=True)
     with tempfile.TemporaryDirectory(dir=into) as tmpd:
-        archive_file = archive.download(url, sha256, dest=f"{tmpd}/download")
         top_level_dir = "node-env"
-        archive.unpack(
-            archive_file,
-            tmpd,
-            perform_strip1=True,
-            strip1_new_prefix=top_level_dir,
-        )
+        archive.unpack_cached(url, sha256, tmpd, n=1, new_prefix=top_level_dir)
 
-        # the archive was atomically placed into tmpd so
-        # these are on the same fs and can be atomically moved too
+        # tmpd is inside into so this can be atomically moved
         os.replace(f"{tmpd}/{top_level_dir}", f"{into}/{top_level_dir}")
 
 
@@ -92,7 +86,13 @@ def install_pnpm(reporoot: str) -> None:
         pnpm = package_json["packageManager"]
         pnpm_version = pnpm.split("@")[-1]
 
+    inputs = state.fingerprint(pnpm_version)
+    outputs = (f"{binroot}/pnpm", f"{binroot}/node-env/bin/pnpm")
+    if state.unchanged(reporoot, "pnpm", inputs, outputs):
+        return
+
     if installed_pnpm(pnpm_version, binroot):
+        state.record(reporoot, "pnpm", inputs, outputs)
         return
 
     print(f"installing pnpm {pnpm_version}...")
@@ -115,11 +115,19 @@ exec {binroot}/node-env/bin/pnpm "$@"
         shell_escape={"binroot": binroot},
     )
 
+    state.record(reporoot, "pnpm", inputs, outputs)
+
 
 def install(version: str, url: str, sha256: str, reporoot: str) -> None:
     binroot = fs.ensure_binroot(reporoot)
 
+    inputs = state.fingerprint(version, url, sha256)
+    outputs = (f"{binroot}/node", f"{binroot}/node-env/bin/node")
+    if state.unchanged(reporoot, "node", inputs, outputs):
+        return
+
     if installed(version, binroot):
+        state.record(reporoot, "node", inputs, outputs)
         return
 
     print(f"installing node {version}...")
@@ -141,3 +149,5 @@ exec {binroot}/node-env/bin/{shim} "$@"
 
     if not installed(version, binroot):
         raise SystemExit(f"failed to install node {version}!")
+
+    state.record(reporoot, "node", inputs, outputs)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import os
+
+# when offline, downloads only ever come from the download cache (see
+# `devenv prefetch`) and fail right away otherwise, instead of retrying;
+# set by SENTRY_DEVENV_OFFLINE=1 or `devenv sync --offline`
+enabled = os.getenv("SENTRY_DEVENV_OFFLINE", "").lower() in ("1", "true")
+
+# passed to everything run through proc.run when offline, so that the
+# package managers sync runs stick to their own caches too
+env = {
+    "UV_OFFLINE": "1",
+    # pip can't install from its cache alone, but it can at least
+    # fail fast rather than retrying
+    "PIP_NO_INDEX": "1",
+    "npm_config_offline": "true",
+}
+
+
+def error(url: str, sha256: str) -> RuntimeError:
+    return RuntimeError(
+        f"{url} ({sha256}) isn't in the download cache and devenv is offline, run `devenv prefetch` once you're back online"
+    )
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import configparser
+import os
+from dataclasses import dataclass
+from functools import partial
+
+from devenv.constants import SYSTEM_MACHINE
+from devenv.lib import archive
+from devenv.lib import cache
+from devenv.lib import tasks
+from devenv.lib.repository import Repository
+
+
+@dataclass(frozen=True)
+class Artifact:
+    # the repo config section it's declared in
+    section: str
+    url: str
+    sha256: str
+
+
+def artifacts(
+    cfg: configparser.ConfigParser, system_machine: str = SYSTEM_MACHINE
+) -> list[Artifact]:
+    """
+    Every artifact declared in a repo config for a platform, that is any
+    section with e.g.
+
+    darwin_arm64 = https://...
+    darwin_arm64_sha256 = ...
+    """
+    found: dict[str, Artifact] = {}
+    for section in cfg.sections():
+        url = cfg[section].get(system_machine)
+        sha256 = cfg[section].get(f"{system_machine}_sha256")
+        # the same artifact may well be declared more than once
+        if url and sha256 and sha256 not in found:
+            found[sha256] = Artifact(section, url, sha256)
+    return list(found.values())
+
+
+def missing(artifacts: list[Artifact]) -> list[Artifact]:
+    """The artifacts that aren't in the download cache."""
+    return [a for a in artifacts if not os.path.exists(cache.path(a.sha256))]
+
+
+def prefetch(
+    reporoot: str, max_workers: int = tasks.DEFAULT_MAX_WORKERS
+) -> list[Artifact]:
+    """
+    Downloads everything the repo config declares for this platform that
+    isn't in the download cache yet, at most max_workers at a time, so that
+    a later sync doesn't need the network. Returns what was downloaded.
+    """
+    todo = missing(artifacts(Repository(reporoot).config()))
+
+    graph = tasks.Graph(max_workers)
+    for a in todo:
+        graph.add(
+            f"{a.section} ({a.sha256[:12]})",
+            partial(archive.download, a.url, a.sha256),
+        )
+    graph.run()
+
+    return todo
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import os
 import shlex
+import signal
 import subprocess
+import threading
 from pathlib import Path
 from typing import Literal
 from typing import overload
@@ -12,16 +15,98 @@ from devenv.constants import homebrew_bin
 from devenv.constants import root
 from devenv.constants import shell_path
 from devenv.constants import user_environ
+from devenv.lib import offline
+from devenv.lib import tasks
 
 base_path = f"{root}/bin:{homebrew_bin}:{user_environ['PATH']}"
 base_env = {"PATH": base_path, "HOME": home, "SHELL": shell_path}
 
+_local = threading.local()
+
 
 def quote(cmd: tuple[str, ...]) -> str:
     """convert a command to bash-compatible form"""
     return " ".join(shlex.quote(arg) for arg in cmd)
 
 
+class Scope:
+    """
+    Keeps track of the subprocesses started through run by the threads
+    inside it (with scope: ...), so that another thread can kill them
+    all, e.g. once what they're part of takes too long. Each is started
+    in its own process group so that its children are killed too.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.procs: set[subprocess.Popen[bytes]] = set()
+        self.killed = False
+        self.outer: Scope | None = None
+
+    def __enter__(self) -> Scope:
+        self.outer = getattr(_local, "scope", None)
+        _local.scope = self
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        _local.scope = self.outer
+
+    def kill(self) -> None:
+        """Kills whatever's running, and anything that's started from now on."""
+        with self.lock:
+            self.killed = True
+            for p in self.procs:
+                _killpg(p)
+
+
+def _killpg(p: subprocess.Popen[bytes]) -> None:
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _run(
+    cmd: tuple[str, ...],
+    *,
+    stdout: int | None,
+    stderr: int | None,
+    cwd: Path | str | None,
+    env: dict[str, str],
+) -> subprocess.CompletedProcess[bytes]:
+    """subprocess.run(check=True), keeping track of cmd in the current Scope."""
+    scope: Scope | None = getattr(_local, "scope", None)
+    if scope is None:
+        return subprocess.run(
+            cmd, check=True, stdout=stdout, stderr=stderr, cwd=cwd, env=env
+        )
+
+    # a background process group can't read from the terminal (it'd be
+    # stopped by SIGTTIN until killed), so don't let it try
+    with subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=stdout,
+        stderr=stderr,
+        cwd=cwd,
+        env=env,
+        process_group=0,
+    ) as p:
+        with scope.lock:
+            if scope.killed:
+                _killpg(p)
+            scope.procs.add(p)
+        try:
+            out, _ = p.communicate()
+        finally:
+            with scope.lock:
+                scope.procs.discard(p)
+
+    if p.returncode:
+        raise subprocess.CalledProcessError(p.returncode, cmd, out)
+    return subprocess.CompletedProcess(cmd, p.returncode, out)
+
+
 def xtrace(cmd: tuple[str, ...]) -> None:
     """Print a commandline, similar to how xtrace does."""
 
@@ -66,12 +151,17 @@ def run(
     # poorly named, should've been like capture_combined_output
     stdout: bool = False,
 ) -> str | None:
-    _stdout = subprocess.PIPE if stdout else None
-    _stderr = subprocess.STDOUT if stdout else None
+    # when running as part of a tasks.Graph, output is grouped per task
+    captured = None if stdout else tasks.captured_output()
+
+    _stdout = subprocess.PIPE if stdout or captured else None
+    _stderr = subprocess.STDOUT if stdout or captured else None
     del stdout
 
     if env is None:
         env = {}
+    if offline.enabled:
+        env = {**offline.env, **env}
     env = {**constants.user_environ, **base_env, **env}
 
     if pathprepend:
@@ -80,9 +170,7 @@ def run(
     if constants.DEBUG:
         xtrace(cmd)
     try:
-        proc = subprocess.run(
-            cmd, check=True, stdout=_stdout, stderr=_stderr, cwd=cwd, env=env
-        )
+        proc = _run(cmd, stdout=_stdout, stderr=_stderr, cwd=cwd, env=env)
     except FileNotFoundError as e:
         # This is reachable if the command isn't found.
         if exit:
@@ -91,7 +179,9 @@ def run(
             raise RuntimeError(f"{e}") from None
     except subprocess.CalledProcessError as e:
         detail = f"Command `{quote(e.cmd)}` failed! (code {e.returncode})"
-        if _stdout:
+        if captured is not None:
+            captured.write(e.stdout.decode())
+        elif _stdout:
             detail += f"""
 combined out:
 {"" if e.stdout is None else e.stdout.decode()}
@@ -101,6 +191,8 @@ combined out:
         else:
             raise RuntimeError(detail) from None
     else:
-        if _stdout:
+        if captured is not None:
+            captured.write(proc.stdout.decode())
+        elif _stdout:
             return proc.stdout.decode().strip()
         return None
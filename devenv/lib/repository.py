@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import importlib
 import os.path
 from configparser import ConfigParser
 
@@ -34,6 +33,9 @@ class Repository:
         return get_config(f"{self.config_path}/config.ini")
 
     def check_minimum_version(self) -> None:
+        # (importlib.metadata is slow to import, and only needed here)
+        import importlib.metadata
+
         version = importlib.metadata.version("sentry-devenv")
 
         cfg = self.config()
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from collections.abc import Sequence
+
+# set by `devenv sync --force` to ignore (but still update) recorded state
+force = False
+
+
+def state_root(reporoot: str) -> str:
+    root = f"{reporoot}/.devenv/state"
+    os.makedirs(root, exist_ok=True)
+    if not os.path.exists(f"{root}/.gitignore"):
+        with open(f"{root}/.gitignore", "w") as f:
+            f.write("""*
+# automatically written by devenv
+""")
+    return root
+
+
+def fingerprint(*inputs: str) -> str:
+    """Hashes the inputs of a step, e.g. the version, url and sha256 from config.ini."""
+    h = hashlib.sha256()
+    for s in inputs:
+        h.update(s.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """Hashes a file's contents (a missing file hashes differently from an empty one)."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except FileNotFoundError:
+        return "missing"
+
+
+def _outputs_signature(outputs: Sequence[str]) -> list[list[int]] | None:
+    # the cheapest way to tell an output hasn't been touched since we made it
+    sig: list[list[int]] = []
+    for fp in outputs:
+        try:
+            st = os.stat(fp)
+        except FileNotFoundError:
+            return None
+        sig.append([st.st_ino, st.st_mtime_ns, st.st_size])
+    return sig
+
+
+def _path(reporoot: str, step: str) -> str:
+    name = re.sub(r"[^\w.-]", "_", step)
+    return f"{state_root(reporoot)}/{name}"
+
+
+def unchanged(
+    reporoot: str, step: str, inputs: str, outputs: Sequence[str]
+) -> bool:
+    """
+    Whether step was last recorded with the same inputs fingerprint, and its
+    outputs still exist and haven't been modified since.
+    """
+    if force:
+        return False
+
+    try:
+        with open(_path(reporoot, step)) as f:
+            recorded = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+
+    sig = _outputs_signature(outputs)
+    return (
+        sig is not None
+        and recorded.get("inputs") == inputs
+        and recorded.get("outputs") == sig
+    )
+
+
+def record(
+    reporoot: str, step: str, inputs: str, outputs: Sequence[str]
+) -> None:
+    """Records that step completed with inputs, producing outputs."""
+    sig = _outputs_signature(outputs)
+    if sig is None:
+        return
+
+    fp = _path(reporoot, step)
+    with tempfile.NamedTemporaryFile(
+        "w", delete=False, dir=os.path.dirname(fp)
+    ) as f:
+        json.dump({"inputs": inputs, "outputs": sig}, f)
+    os.replace(f.name, fp)
+
+
+def forget(reporoot: str, step: str) -> None:
+    try:
+        os.remove(_path(reporoot, step))
+    except FileNotFoundError:
+        pass
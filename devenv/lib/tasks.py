@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+import typing
+from collections.abc import Callable
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from concurrent.futures import wait
+from dataclasses import dataclass
+from typing import ParamSpec
+from typing import TypeVar
+
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+
+_local = threading.local()
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+def captured_output() -> io.StringIO | None:
+    """
+    If the current thread is running a task, returns the buffer
+    its output is being grouped into.
+    """
+    out: io.StringIO | None = getattr(_local, "output", None)
+    return out
+
+
+class _Stdout:
+    """Routes writes from task threads into their own buffers."""
+
+    def __init__(self, stream: typing.TextIO) -> None:
+        self.stream = stream
+
+    def __getattr__(self, name: str) -> object:
+        return getattr(self.stream, name)
+
+    def write(self, s: str) -> int:
+        out = captured_output()
+        if out is None:
+            return self.stream.write(s)
+        return out.write(s)
+
+    def flush(self) -> None:
+        if captured_output() is None:
+            self.stream.flush()
+
+
+class DaemonExecutor(Executor):
+    """
+    Runs everything submitted on its own daemon thread (callers bound how
+    many at once). Unlike ThreadPoolExecutor, something that never
+    returns (or is still running when ctrl-c is hit) doesn't hold up
+    anything else, shutdown or exiting.
+    """
+
+    def submit(
+        self, fn: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs
+    ) -> Future[T]:
+        future: Future[T] = Future()
+
+        def run() -> None:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    fn: Callable[[], object]
+    deps: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class _Result:
+    output: str
+    elapsed: float
+    error: BaseException | None
+
+
+def _run(task: Task) -> _Result:
+    _local.output = out = io.StringIO()
+    start = time.monotonic()
+    try:
+        task.fn()
+    except (Exception, SystemExit) as e:
+        error: BaseException | None = e
+    else:
+        error = None
+    finally:
+        _local.output = None
+    return _Result(out.getvalue(), time.monotonic() - start, error)
+
+
+class Graph:
+    """
+    A set of tasks (usually tool installs in a repo's sync.py) and their
+    dependencies. Tasks whose dependencies are satisfied run concurrently,
+    on at most max_workers threads, so independent downloads and unpacks
+    overlap and a cold sync costs about as much as its longest chain.
+
+    Each task's output (including that of subprocesses started through
+    proc.run) is buffered and printed in one piece when the task finishes.
+    If anything fails, everything that doesn't depend on it still runs,
+    and a SystemExit summarizing all failures is raised at the end.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be positive")
+        self.max_workers = max_workers
+        self.tasks: dict[str, Task] = {}
+
+    def add(
+        self, name: str, fn: Callable[[], object], deps: Iterable[str] = ()
+    ) -> None:
+        if name in self.tasks:
+            raise ValueError(f"task {name} was already added")
+        self.tasks[name] = Task(name, fn, tuple(deps))
+
+    def _validate(self) -> None:
+        for task in self.tasks.values():
+            for dep in task.deps:
+                if dep not in self.tasks:
+                    raise ValueError(
+                        f"task {task.name} depends on unknown {dep}"
+                    )
+
+        # Kahn's algorithm; whatever can't be ordered is part of a cycle
+        indegree = {name: len(task.deps) for name, task in self.tasks.items()}
+        ready = [name for name, n in indegree.items() if n == 0]
+        while ready:
+            name = ready.pop()
+            del indegree[name]
+            for task in self.tasks.values():
+                if name in task.deps:
+                    indegree[task.name] -= 1
+                    if indegree[task.name] == 0:
+                        ready.append(task.name)
+        if indegree:
+            raise ValueError(
+                f"dependency cycle between tasks: {', '.join(sorted(indegree))}"
+            )
+
+    def run(self) -> None:
+        self._validate()
+
+        pending = dict(self.tasks)
+        done: set[str] = set()
+        failed: dict[str, BaseException] = {}
+        blocked: set[str] = set()
+        running: dict[Future[_Result], str] = {}
+
+        stdout = typing.cast(typing.TextIO, _Stdout(sys.stdout))
+        executor = DaemonExecutor()
+
+        def schedule() -> None:
+            changed = True
+            while changed:
+                changed = False
+                for name, task in tuple(pending.items()):
+                    if any(d in failed or d in blocked for d in task.deps):
+                        print(f"⏭️  {name} (a dependency failed)")
+                        blocked.add(name)
+                    elif (
+                        all(d in done for d in task.deps)
+                        and len(running) < self.max_workers
+                    ):
+                        running[executor.submit(_run, task)] = name
+                    else:
+                        continue
+                    del pending[name]
+                    changed = True
+
+        with contextlib.redirect_stdout(stdout):
+            try:
+                schedule()
+                while running:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        result = future.result()
+                        if result.error is None:
+                            print(f"✅ {name} ({result.elapsed:.1f}s)")
+                            done.add(name)
+                        else:
+                            print(f"❌ {name} ({result.elapsed:.1f}s)")
+                            failed[name] = result.error
+                        if result.output:
+                            print(result.output, end="")
+                    schedule()
+            except BaseException:
+                # e.g. ctrl-c, which shouldn't wait for whatever's running
+                # (those are daemon threads, so they don't hold up exiting)
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        if failed:
+            raise SystemExit(
+                "\n".join(
+                    (
+                        f"{len(failed)} task(s) failed:",
+                        *(f"- {name}: {e}" for name, e in failed.items()),
+                        *(
+                            (f"skipped: {', '.join(sorted(blocked))}",)
+                            if blocked
+                            else ()
+                        ),
+                    )
+                )
+            )
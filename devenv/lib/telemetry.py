@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import configparser
+
+# https://sentry.sentry.io/settings/projects/sentry-dev-env/keys/
+DSN = "https://9bdb053cb8274ea69231834d1edeec4c@o1.ingest.sentry.io/5723503"
+
+DEFAULT_TRACES_SAMPLE_RATE = 0.1
+# seconds
+DEFAULT_FLUSH_TIMEOUT = 1.0
+
+
+def init(cfg: configparser.ConfigParser) -> None:
+    """
+    Sets up sentry_sdk according to the [telemetry] section of the
+    global config. sentry_sdk is only imported here since it's slow to,
+    so this should be called as late as possible (and not at all for
+    commands that don't need it).
+    """
+    if not cfg.getboolean("telemetry", "enabled", fallback=True):
+        return
+
+    import sentry_sdk
+
+    sentry_sdk.init(
+        dsn=DSN,
+        # errors are always reported, but only some runs are traced
+        # (an unsampled run has nothing to send at exit)
+        traces_sample_rate=cfg.getfloat(
+            "telemetry",
+            "traces_sample_rate",
+            fallback=DEFAULT_TRACES_SAMPLE_RATE,
+        ),
+        # how long exiting waits for whatever's left to be sent
+        shutdown_timeout=cfg.getfloat(
+            "telemetry", "flush_timeout", fallback=DEFAULT_FLUSH_TIMEOUT
+        ),
+    )
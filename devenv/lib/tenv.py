@@ -2,30 +2,28 @@ from __future__ import annotations
 
 import os
 import shutil
-import tempfile
 
 from devenv.lib import archive
 from devenv.lib import fs
 from devenv.lib import proc
+from devenv.lib import state
 
 
 def _install(url: str, sha256: str, into: str) -> None:
     TENV_ROOT = f"{into}/tenv-root"
     os.makedirs(f"{TENV_ROOT}/bin", exist_ok=True)
 
-    with tempfile.TemporaryDirectory(dir=into) as tmpd:
-        archive_file = archive.download(url, sha256, dest=f"{tmpd}/download")
-        archive.unpack(archive_file, tmpd)
-
-        # the archive was atomically placed into tmpd so
-        # these are on the same fs and can be atomically moved too
-        os.replace(f"{tmpd}/terraform", f"{TENV_ROOT}/bin/terraform")
-        os.replace(f"{tmpd}/tf", f"{TENV_ROOT}/bin/tf")
-        os.replace(f"{tmpd}/terragrunt", f"{TENV_ROOT}/bin/terragrunt")
-        os.replace(f"{tmpd}/tenv", f"{TENV_ROOT}/bin/tenv")
+    archive_file = archive.download(url, sha256)
+    archive.extract(
+        archive_file,
+        {
+            name: f"{TENV_ROOT}/bin/{name}"
+            for name in ("terraform", "tf", "terragrunt", "tenv")
+        },
+    )
 
-        # those all need to go inside a bin instead of like, TENV_ROOT/terraform
-        # because tenv wants to mkdir that
+    # those all need to go inside a bin instead of like, TENV_ROOT/terraform
+    # because tenv wants to mkdir that
 
     # These shims make sure we're executing with our custom TENV_ROOT,
     # otherwise there's potential for collision with ~/.tenv.
@@ -84,9 +82,15 @@ def install(version: str, url: str, sha256: str, reporoot: str) -> None:
     binroot = fs.ensure_binroot(reporoot)
     binpath = f"{binroot}/tenv"
 
+    inputs = state.fingerprint(version, url, sha256)
+    outputs = (binpath, f"{binroot}/tenv-root/bin/tenv")
+    if state.unchanged(reporoot, "tenv", inputs, outputs):
+        return
+
     if shutil.which("tenv", path=binroot) == binpath:
         installed_version = _version(binpath)
         if version == installed_version:
+            state.record(reporoot, "tenv", inputs, outputs)
             return
         print(f"installed tenv {installed_version} is unexpected!")
 
@@ -97,3 +101,5 @@ def install(version: str, url: str, sha256: str, reporoot: str) -> None:
     installed_version = _version(binpath)
     if version != installed_version:
         raise SystemExit("Failed to install tenv {version}!")
+
+    state.record(reporoot, "tenv", inputs, outputs)
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import os
 import shutil
-import tempfile
 
 from devenv.lib import archive
 from devenv.lib import fs
@@ -10,14 +9,10 @@ from devenv.lib import proc
 
 
 def _install(url: str, sha256: str, into: str) -> None:
-    with tempfile.TemporaryDirectory(dir=into) as tmpd:
-        archive_file = archive.download(url, sha256, dest=f"{tmpd}/download")
-        archive.unpack(archive_file, tmpd, perform_strip1=True)
-
-        # the archive was atomically placed into tmpd so
-        # these are on the same fs and can be atomically moved too
-        os.replace(f"{tmpd}/uv", f"{into}/uv")
-        os.replace(f"{tmpd}/uvx", f"{into}/uvx")
+    archive_file = archive.download(url, sha256)
+    archive.extract(
+        archive_file, {"uv": f"{into}/uv", "uvx": f"{into}/uvx"}, n=1
+    )
 
 
 def uninstall(binroot: str) -> None:
@@ -1,19 +1,33 @@
 from __future__ import annotations
 
+import fcntl
 import os
 import shutil
 from enum import Enum
 from typing import Optional
 
 from devenv import pythons
+from devenv.constants import root
 from devenv.lib import config
 from devenv.lib import fs
 from devenv.lib import proc
+from devenv.lib import state
 
 VenvStatus = Enum(
     "VenvStatus", ("OK", "VERSION_MISMATCH", "NOT_PRESENT", "NOT_CONFIGURED")
 )
 
+INSTALLERS = ("pip", "uv")
+
+# shared by every uv-backed venv so packages are only ever downloaded once
+uv_cache_dir = f"{root}/cache/uv"
+
+# pristine venvs keyed by (installer, python, requirements) that new venvs
+# are cloned from, see ensure(requirements=...)
+templates_root = f"{root}/venv-templates"
+MAX_TEMPLATES = 5
+_template_marker = ".devenv-template"
+
 
 def get(
     reporoot: str, name: str
@@ -49,29 +63,146 @@ def get(
     )
 
 
+def get_installer(reporoot: str, name: str) -> str:
+    """
+    Which installer backend to use for the venv, pip (the default) or uv:
+
+    [venv.<name>]
+    installer = uv
+    """
+    cfg = config.get_repo(reporoot)
+
+    if not cfg.has_section(f"venv.{name}"):
+        raise KeyError(f"section venv.{name} not found in repo config")
+
+    installer = cfg[f"venv.{name}"].get("installer", "pip")
+    if installer not in INSTALLERS:
+        raise ValueError(
+            f"venv.{name}: unknown installer {installer}, expected one of {', '.join(INSTALLERS)}"
+        )
+    return installer
+
+
+def _uv(reporoot: str | None = None) -> tuple[str, dict[str, str]]:
+    # devenv.lib.uv.install puts it into the repo's binroot
+    path = proc.base_path
+    if reporoot is not None:
+        path = f"{fs.ensure_binroot(reporoot)}:{path}"
+    uv = shutil.which("uv", path=path)
+    if uv is None:
+        raise SystemExit(
+            "the uv installer backend requires uv, run `brew install uv`"
+        )
+    return uv, {"UV_CACHE_DIR": uv_cache_dir}
+
+
+def _create(
+    python: str, venv_dir: str, installer: str, reporoot: str | None = None
+) -> None:
+    if installer == "uv":
+        uv, env = _uv(reporoot)
+        proc.run(
+            (uv, "venv", "--quiet", "--python", python, venv_dir),
+            exit=True,
+            env=env,
+        )
+    else:
+        proc.run((python, "-m", "venv", venv_dir), exit=True)
+
+
+def _install(
+    venv_dir: str,
+    requirements: str,
+    editable_paths: Optional[tuple[str, ...]],
+    installer: str,
+    reporoot: str | None = None,
+) -> None:
+    env = None
+    if installer == "uv":
+        uv, env = _uv(reporoot)
+        cmd: tuple[str, ...] = (
+            uv,
+            "pip",
+            "install",
+            "--quiet",
+            "--python",
+            f"{venv_dir}/bin/python",
+            "-r",
+            requirements,
+        )
+    else:
+        cmd = (
+            f"{venv_dir}/bin/python",
+            "-m",
+            "pip",
+            "--disable-pip-version-check",
+            "--no-color",
+            "--quiet",
+            "--require-virtualenv",
+            "install",
+            "-r",
+            requirements,
+        )
+    if editable_paths is not None:
+        for path in editable_paths:
+            cmd = (*cmd, "-e", path)
+    proc.run(cmd, env=env)
+
+
+def _python_version(venv_dir: str) -> str:
+    try:
+        with open(f"{venv_dir}/pyvenv.cfg", "r") as f:
+            for line in f:
+                if line.startswith("version"):
+                    return line.split("=")[1].strip()
+    except FileNotFoundError:
+        pass
+    return ""
+
+
+def _stamp_path(venv_dir: str) -> str:
+    # lives inside the venv so that recreating it also invalidates this
+    return f"{venv_dir}/.devenv-sync-stamp"
+
+
+def _stamp(
+    venv_dir: str,
+    requirements: str,
+    editable_paths: Optional[tuple[str, ...]] = None,
+    installer: str = "pip",
+) -> str:
+    return state.fingerprint(
+        installer,
+        _python_version(venv_dir),
+        state.file_digest(requirements),
+        *(
+            state.file_digest(f"{path}/{f}")
+            for path in editable_paths or ()
+            for f in ("pyproject.toml", "setup.py", "setup.cfg")
+        ),
+    )
+
+
 def sync(
     reporoot: str,
     venv_dir: str,
     requirements: str,
     editable_paths: Optional[tuple[str, ...]] = None,
     bins: Optional[tuple[str, ...]] = None,
+    installer: str = "pip",
 ) -> None:
-    cmd: tuple[str, ...] = (
-        f"{venv_dir}/bin/python",
-        "-m",
-        "pip",
-        "--disable-pip-version-check",
-        "--no-color",
-        "--quiet",
-        "--require-virtualenv",
-        "install",
-        "-r",
-        requirements,
-    )
-    if editable_paths is not None:
-        for path in editable_paths:
-            cmd = (*cmd, "-e", path)
-    proc.run(cmd)
+    stamp = _stamp(venv_dir, requirements, editable_paths, installer)
+    try:
+        with open(_stamp_path(venv_dir)) as f:
+            up_to_date = not state.force and f.read() == stamp
+    except FileNotFoundError:
+        up_to_date = False
+
+    if not up_to_date:
+        _install(venv_dir, requirements, editable_paths, installer, reporoot)
+
+        with open(_stamp_path(venv_dir), "w") as f:
+            f.write(stamp)
 
     if bins is not None:
         binroot = fs.ensure_binroot(reporoot)
@@ -100,7 +231,106 @@ def check(venv: str, python_version: str) -> VenvStatus:
     return VenvStatus.OK
 
 
-def ensure(venv: str, python_version: str, url: str, sha256: str) -> None:
+def _template(
+    python: str,
+    python_version: str,
+    requirements: str,
+    installer: str,
+    reporoot: str | None = None,
+) -> str:
+    """
+    Returns a pristine venv with just requirements installed (editable
+    paths are repo-specific so they're left to venv.sync), building it
+    first if there isn't one for this python and requirements yet.
+    """
+    key = state.fingerprint(
+        installer, python_version, python, state.file_digest(requirements)
+    )
+    tpl = f"{templates_root}/{key}"
+    marker = f"{tpl}/{_template_marker}"
+
+    os.makedirs(templates_root, exist_ok=True)
+    with open(f"{tpl}.lock", "a") as lockf:
+        fcntl.flock(lockf, fcntl.LOCK_EX)
+        if not os.path.exists(marker):
+            # whatever's there was interrupted halfway
+            shutil.rmtree(tpl, ignore_errors=True)
+            print(f"building a venv template for {requirements}...")
+            _create(python, tpl, installer, reporoot)
+            _install(tpl, requirements, None, installer, reporoot)
+            open(marker, "w").close()
+        # for recency in _prune_templates
+        os.utime(marker)
+
+    _prune_templates()
+    return tpl
+
+
+def _prune_templates() -> None:
+    templates: list[tuple[float, str]] = []
+    for name in os.listdir(templates_root):
+        marker = f"{templates_root}/{name}/{_template_marker}"
+        if os.path.exists(marker):
+            templates.append((os.stat(marker).st_mtime, name))
+
+    for _, name in sorted(templates, reverse=True)[MAX_TEMPLATES:]:
+        # (the lockfile is left alone: unlinking it while someone else
+        # waits on it would let a third process lock a new one alongside)
+        with open(f"{templates_root}/{name}.lock", "a") as lockf:
+            fcntl.flock(lockf, fcntl.LOCK_EX)
+            shutil.rmtree(f"{templates_root}/{name}", ignore_errors=True)
+
+
+def _materialize(tpl: str, venv: str) -> None:
+    """
+    Clones tpl into venv (see fs.clone_tree). pip and python replace
+    files rather than writing into them, so the template stays pristine
+    as long as nothing edits the venv in place.
+
+    Scripts in bin and pyvenv.cfg refer to the template's own path,
+    those are rewritten (as fresh, unshared files).
+    """
+    fs.clone_tree(tpl, venv)
+
+    try:
+        os.remove(f"{venv}/{_template_marker}")
+    except FileNotFoundError:
+        pass
+
+    old, new = tpl.encode(), venv.encode()
+    with os.scandir(f"{venv}/bin") as it:
+        paths = [de.path for de in it if de.is_file(follow_symlinks=False)]
+    for fp in (*paths, f"{venv}/pyvenv.cfg"):
+        with open(fp, "rb") as f:
+            contents = f.read()
+        if old not in contents:
+            continue
+        mode = os.stat(fp).st_mode
+        # don't write through a hardlink into the template!
+        os.remove(fp)
+        with open(fp, "wb") as f:
+            f.write(contents.replace(old, new))
+        os.chmod(fp, mode)
+
+
+def ensure(
+    venv: str,
+    python_version: str,
+    url: str,
+    sha256: str,
+    installer: str = "pip",
+    requirements: str | None = None,
+    reporoot: str | None = None,
+) -> None:
+    """
+    Makes sure venv exists and uses python_version, (re)creating it otherwise.
+
+    If requirements is given, the venv is materialized from a cached
+    template that already has them installed (see _template), so that
+    e.g. another worktree of the same repo gets a ready venv in seconds.
+
+    If reporoot is given, uv is also looked for in its binroot.
+    """
     venv_status = check(venv, python_version)
     if venv_status == VenvStatus.OK:
         return
@@ -111,10 +341,20 @@ def ensure(venv: str, python_version: str, url: str, sha256: str) -> None:
     if os.path.exists(venv):
         shutil.rmtree(venv)
 
-    proc.run(
-        (pythons.get(python_version, url, sha256), "-m", "venv", venv),
-        exit=True,
-    )
+    python = pythons.get(python_version, url, sha256)
+    if requirements is not None:
+        tpl = _template(
+            python, python_version, requirements, installer, reporoot
+        )
+        _materialize(tpl, venv)
+    else:
+        _create(python, venv, installer, reporoot)
+
+    # whatever was installed before is gone
+    try:
+        os.remove(_stamp_path(venv))
+    except FileNotFoundError:
+        pass
 
     with open(f"{venv}/.gitignore", "w") as f:
         f.write("""*
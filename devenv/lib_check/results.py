@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from collections.abc import Sequence
+
+from devenv.lib import cache
+
+
+def _path() -> str:
+    return f"{cache.cache_root}/doctor.json"
+
+
+def _load() -> dict[str, dict[str, str | float]]:
+    try:
+        with open(_path()) as f:
+            recorded: dict[str, dict[str, str | float]] = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return recorded
+
+
+def fresh(key: str, digest: str, ttl: float) -> bool:
+    """
+    Whether the check recorded under key (see doctor.Check.key, whose
+    module hashes to digest) passed less than ttl seconds ago.
+    """
+    if ttl <= 0 or not digest:
+        return False
+    entry = _load().get(key)
+    if entry is None or entry.get("digest") != digest:
+        return False
+    passed = entry.get("time", 0)
+    return isinstance(passed, float) and time.time() - passed < ttl
+
+
+def record(passed: Sequence[tuple[str, str]], failed: Sequence[str]) -> None:
+    """
+    Records the checks that just passed, as (key, digest), and forgets
+    the ones that just failed.
+    """
+    recorded = _load()
+    if not passed and not any(key in recorded for key in failed):
+        return
+
+    now = time.time()
+    for key, digest in passed:
+        recorded[key] = {"digest": digest, "time": now}
+    for key in failed:
+        recorded.pop(key, None)
+
+    os.makedirs(cache.cache_root, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", dir=cache.cache_root, delete=False
+    ) as f:
+        json.dump(recorded, f)
+    os.replace(f.name, _path())
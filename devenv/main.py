@@ -1,20 +1,14 @@
 from __future__ import annotations
 
 import argparse
+import importlib
 import os
 from collections.abc import Sequence
 
-from devenv import bootstrap
-from devenv import colima
-from devenv import doctor
-from devenv import fetch
-from devenv import pin_gha
-from devenv import sync
-from devenv import update
-from devenv.constants import home
 from devenv.constants import troubleshooting_help
 from devenv.constants import user
-from devenv.constants import version
+from devenv.lib import telemetry
+from devenv.lib.config import global_config_path
 from devenv.lib.config import read_config
 from devenv.lib.context import Context
 from devenv.lib.fs import gitroot
@@ -22,6 +16,63 @@ from devenv.lib.modules import DevModuleInfo
 from devenv.lib.modules import ExitCode
 from devenv.lib.repository import Repository
 
+# command -> (module, help)
+# a command's module (and everything it pulls in) is only imported when
+# that command runs, since devenv runs in every direnv hook and script;
+# each module's module_info has to agree with this
+COMMANDS: dict[str, tuple[str, str]] = {
+    "bootstrap": (
+        "devenv.bootstrap",
+        "Bootstraps the development environment.",
+    ),
+    "cache": ("devenv.cache", "Manage the download cache."),
+    "fetch": ("devenv.fetch", "Fetches a repository"),
+    "colima": ("devenv.colima", "Colima convenience commands."),
+    "doctor": (
+        "devenv.doctor",
+        "Diagnose common issues, and optionally try to fix them.",
+    ),
+    "mirror": ("devenv.mirror", "Serve the download cache to other machines."),
+    "pin_gha": ("devenv.pin_gha", "Pins github actions."),
+    "prefetch": (
+        "devenv.prefetch",
+        "Download everything the repo's sync needs into the cache.",
+    ),
+    "sync": ("devenv.sync", "Resyncs the environment."),
+    "update": ("devenv.update", "Updates global devenv and tools."),
+}
+
+# fast, read-only (or long-running) invocations that aren't worth
+# waiting on sentry_sdk for, as (command, subcommand)
+QUIET = {("cache", "stats"), ("colima", "check"), ("mirror", "serve")}
+
+
+def _quiet(argv: Sequence[str]) -> bool:
+    if {"-h", "--help", "--version"} & set(argv):
+        return True
+    command, subcommand, *_ = (
+        *(a for a in argv[1:] if not a.startswith("-")),
+        "",
+        "",
+    )
+    return not command or (command, subcommand) in QUIET
+
+
+class _VersionAction(argparse.Action):
+    """Like action="version", but only looks up the version when asked to."""
+
+    def __call__(
+        self,
+        parser: argparse.ArgumentParser,
+        namespace: argparse.Namespace,
+        values: object,
+        option_string: str | None = None,
+    ) -> None:
+        from devenv.constants import version
+
+        print(version)
+        parser.exit()
+
 
 def devenv(argv: Sequence[str], config_path: str) -> ExitCode:
     # determine current repo, if applicable
@@ -44,19 +95,13 @@ def devenv(argv: Sequence[str], config_path: str) -> ExitCode:
         else os.path.expanduser("~/code")
     )
 
-    modinfo_list: Sequence[DevModuleInfo] = [
-        module.module_info
-        for module in [bootstrap, fetch, colima, doctor, pin_gha, sync, update]
-        if hasattr(module, "module_info")
-    ]
-
     # TODO: Search for modules in work repo
 
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog=troubleshooting_help,
     )
-    parser.add_argument("--version", action="version", version=version)
+    parser.add_argument("--version", action=_VersionAction, nargs=0)
     subparser = parser.add_subparsers(
         title=argparse.SUPPRESS,
         metavar="command",
@@ -64,11 +109,11 @@ def devenv(argv: Sequence[str], config_path: str) -> ExitCode:
         required=True,
     )
 
-    for info in modinfo_list:
+    for command, (_, help) in COMMANDS.items():
         # Argparse stuff
         subparser.add_parser(
-            info.command,
-            help=info.help,
+            command,
+            help=help,
             formatter_class=argparse.RawDescriptionHelpFormatter,
             epilog=troubleshooting_help,
         )
@@ -86,10 +131,9 @@ def devenv(argv: Sequence[str], config_path: str) -> ExitCode:
         "repo": Repository(current_root) if current_root else None,
     }
 
-    command_actions = {info.command: info.action for info in modinfo_list}
-    action = command_actions.get(args.command)
-    assert action is not None
-    return action(context, remainder)
+    module, _ = COMMANDS[args.command]
+    info: DevModuleInfo = importlib.import_module(module).module_info
+    return info.action(context, remainder)
 
 
 def main() -> ExitCode:
@@ -98,16 +142,10 @@ def main() -> ExitCode:
 
     import sys
 
-    import sentry_sdk
-
-    sentry_sdk.init(
-        # https://sentry.sentry.io/settings/projects/sentry-dev-env/keys/
-        dsn="https://9bdb053cb8274ea69231834d1edeec4c@o1.ingest.sentry.io/5723503",
-        # enable performance monitoring
-        traces_sample_rate=1.0,
-    )
+    if not _quiet(sys.argv):
+        telemetry.init(read_config(global_config_path))
 
-    return devenv(sys.argv, f"{home}/.config/sentry-devenv/config.ini")
+    return devenv(sys.argv, global_config_path)
 
 
 if __name__ == "__main__":
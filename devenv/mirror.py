@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Sequence
+
+from devenv.lib import cache
+from devenv.lib import mirror
+from devenv.lib.context import Context
+from devenv.lib.modules import DevModuleInfo
+
+module_help = "Serve the download cache to other machines."
+
+
+def main(context: Context, argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=("serve",))
+    parser.add_argument(
+        "--host",
+        default="",
+        help="serve: the address to listen on (default: all of them)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=mirror.DEFAULT_PORT,
+        help=f"serve: the port to listen on (default: {mirror.DEFAULT_PORT})",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        with mirror.server(args.host, args.port) as server:
+            print(
+                f"serving {cache.cache_root} on http://{args.host or '0.0.0.0'}:{server.server_address[1]}"
+            )
+            print(
+                "add this to [mirror] mirrors in other machines' global config"
+            )
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+    return 0
+
+
+module_info = DevModuleInfo(
+    action=main, name=__name__, command="mirror", help=module_help
+)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import argparse
+from collections.abc import Sequence
+
+from devenv.lib import prefetch
+from devenv.lib import tasks
+from devenv.lib.context import Context
+from devenv.lib.modules import DevModuleInfo
+from devenv.lib.modules import require_repo
+
+module_help = "Download everything the repo's sync needs into the cache."
+
+
+@require_repo
+def main(context: Context, argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=tasks.DEFAULT_MAX_WORKERS,
+        help="How many downloads to run at the same time.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only list what would be downloaded.",
+    )
+    args = parser.parse_args(argv)
+
+    repo = context["repo"]
+    assert repo is not None
+
+    if args.dry_run:
+        for a in prefetch.missing(prefetch.artifacts(repo.config())):
+            print(f"{a.section}: {a.url}")
+        return 0
+
+    downloaded = prefetch.prefetch(repo.path, args.jobs)
+    print(f"downloaded {len(downloaded)} artifact(s), everything's cached")
+    return 0
+
+
+module_info = DevModuleInfo(
+    action=main, name=__name__, command="prefetch", help=module_help
+)
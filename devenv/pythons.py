@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import os
+import shutil
 import sys
+import tempfile
+import threading
 
 from devenv.constants import CI
 from devenv.constants import root
@@ -12,6 +15,10 @@ from devenv.lib import archive
 # on CI.
 FORCE_PY = os.getenv("SENTRY_FORCE_PY", "").lower() in ("1", "true")
 
+# venvs being set up concurrently (see devenv.lib.tasks) may want the same
+# python, which must only be unpacked once
+_lock = threading.Lock()
+
 
 def _is_sys_compatible(version: str) -> bool:
     """Returns ``True`` if the current python interpreter is semver-compatible
@@ -34,8 +41,16 @@ def get(python_version: str, url: str, sha256: str) -> str:
     if CI and not FORCE_PY and _is_sys_compatible(python_version):
         return sys.executable
 
-    archive_file = archive.download(url, sha256)
-    archive.unpack(archive_file, unpack_into)
+    with _lock:
+        if not os.path.exists(f"{unpack_into}/python/bin/python3"):
+            os.makedirs(unpack_into, exist_ok=True)
+            with tempfile.TemporaryDirectory(dir=unpack_into) as tmpd:
+                archive.unpack_cached(url, sha256, tmpd)
+
+                # whatever an interrupted install might've left behind
+                shutil.rmtree(f"{unpack_into}/python", ignore_errors=True)
+                # tmpd is inside unpack_into so this can be atomically moved
+                os.replace(f"{tmpd}/python", f"{unpack_into}/python")
 
     assert os.path.exists(f"{unpack_into}/python/bin/python3")
     return f"{unpack_into}/python/bin/python3"
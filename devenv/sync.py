@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import argparse
 import contextlib
 import importlib.util
 import os
 from collections.abc import Sequence
 
 from devenv.constants import troubleshooting_help
+from devenv.lib import offline
+from devenv.lib import prefetch
+from devenv.lib import state
 from devenv.lib.context import Context
 from devenv.lib.modules import DevModuleInfo
 from devenv.lib.modules import require_repo
@@ -13,15 +17,42 @@ from devenv.lib.modules import require_repo
 
 @require_repo
 def main(context: Context, argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Redo every step, even if its inputs haven't changed since the last sync.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only use what's in the download cache (see `devenv prefetch`), never the network. Same as SENTRY_DEVENV_OFFLINE=1.",
+    )
+    args = parser.parse_args(argv)
+
     repo = context["repo"]
     assert repo is not None
 
+    state.force = args.force
+    if args.offline:
+        offline.enabled = True
+
     if not os.path.exists(f"{repo.config_path}/sync.py"):
         print(f"{repo.config_path}/sync.py not found!")
         return 1
 
     repo.check_minimum_version()
 
+    if offline.enabled:
+        missing = prefetch.missing(prefetch.artifacts(repo.config()))
+        if missing:
+            # what's already installed won't need them, but anything else will
+            print(
+                "devenv is offline and these aren't in the download cache, sync will fail if it needs them:"
+            )
+            for a in missing:
+                print(f"  {a.section}: {a.url}")
+
     spec = importlib.util.spec_from_file_location(
         "sync", f"{repo.config_path}/sync.py"
     )
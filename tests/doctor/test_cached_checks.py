@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import pathlib
+import types
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from devenv import doctor
+from devenv.lib import cache
+from tests.doctor.devenv.checks import failing_check
+from tests.doctor.devenv.checks import passing_check
+
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path: pathlib.Path) -> typing.Generator[None, None, None]:
+    with mock.patch.object(cache, "cache_root", f"{tmp_path}"):
+        yield
+
+
+def _with_ttl(module: types.ModuleType, ttl: object) -> types.ModuleType:
+    m = types.ModuleType(module.__name__)
+    m.__dict__.update(module.__dict__, ttl=ttl)
+    return m
+
+
+def test_check_ttl() -> None:
+    assert doctor.Check(passing_check).ttl == 0
+    assert doctor.Check(_with_ttl(passing_check, 60)).ttl == 60
+
+    with pytest.raises(ValueError):
+        doctor.Check(_with_ttl(passing_check, "60"))
+
+
+def test_cached_checks() -> None:
+    check = doctor.Check(_with_ttl(passing_check, 60))
+    no_ttl = doctor.Check(passing_check)
+    assert doctor.cached_checks([check, no_ttl]) == []
+
+    doctor.record_results({check: (True, ""), no_ttl: (True, "")})
+    assert doctor.cached_checks([check, no_ttl]) == [check]
+
+    # stale
+    with mock.patch("time.time", return_value=2e9):
+        assert doctor.cached_checks([check]) == []
+
+    # the check changed
+    check.digest = "different"
+    assert doctor.cached_checks([check]) == []
+
+
+def test_cached_checks_elsewhere(tmp_path: pathlib.Path) -> None:
+    # the same repo check, in two worktrees
+    checks = []
+    for worktree in ("a", "b"):
+        path = tmp_path / worktree / "check.py"
+        path.parent.mkdir()
+        path.write_bytes(pathlib.Path(f"{passing_check.__file__}").read_bytes())
+        m = _with_ttl(passing_check, 60)
+        m.__file__ = f"{path}"
+        checks.append(doctor.Check(m))
+
+    a, b = checks
+    assert (a.name, a.digest) == (b.name, b.digest)
+
+    doctor.record_results({a: (True, "")})
+    assert doctor.cached_checks([a, b]) == [a]
+
+
+def test_cached_checks_failed() -> None:
+    check = doctor.Check(_with_ttl(passing_check, 60))
+    doctor.record_results({check: (True, "")})
+    assert doctor.cached_checks([check]) == [check]
+
+    doctor.record_results({check: (False, "")})
+    assert doctor.cached_checks([check]) == []
+
+
+def test_run_checks_cached(capsys: pytest.CaptureFixture[str]) -> None:
+    first_check = doctor.Check(failing_check)
+    second_check = doctor.Check(failing_check)
+
+    results = doctor.run_checks(
+        [first_check, second_check], ThreadPoolExecutor(), cached=[second_check]
+    )
+    assert results == {first_check: (False, ""), second_check: (True, "")}
+
+    assert doctor.filter_failing_checks(results, cached=[second_check]) == [
+        first_check
+    ]
+    assert capsys.readouterr().out == (
+        "   ❌ check: failing check\n   \n   ✅ check: failing check (cached)\n"
+    )
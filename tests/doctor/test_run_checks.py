@@ -1,10 +1,19 @@
 from __future__ import annotations
 
+import pathlib
+import subprocess
+import threading
+import time
+import types
+import typing
 from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
 import pytest
 
 from devenv import doctor
+from devenv.lib import proc
+from devenv.lib import tasks
 from tests.doctor.devenv.checks import broken_check
 from tests.doctor.devenv.checks import failing_check
 from tests.doctor.devenv.checks import failing_check_with_msg
@@ -67,3 +76,234 @@ def test_run_checks_broken_check() -> None:
     assert doctor.run_checks([check], ThreadPoolExecutor()) == {
         check: (False, "Check threw a runtime exception: division by zero")
     }
+
+
+def _check(
+    name: str,
+    check: typing.Callable[[], tuple[bool, str]],
+    depends_on: set[str] | None = None,
+) -> doctor.Check:
+    module = types.ModuleType(name)
+    module.__dict__.update(passing_check.__dict__, name=name, check=check)
+    if depends_on is not None:
+        module.__dict__["depends_on"] = depends_on
+    return doctor.Check(module)
+
+
+def test_run_checks_depends_on() -> None:
+    ran: list[str] = []
+
+    def prerequisite() -> tuple[bool, str]:
+        time.sleep(0.01)
+        ran.append("prerequisite")
+        return True, ""
+
+    def dependent() -> tuple[bool, str]:
+        ran.append("dependent")
+        return True, ""
+
+    first_check = _check("dependent", dependent, {"prerequisite", "unknown"})
+    second_check = _check("prerequisite", prerequisite)
+    assert doctor.run_checks(
+        [first_check, second_check], ThreadPoolExecutor()
+    ) == {first_check: (True, ""), second_check: (True, "")}
+    assert ran == ["prerequisite", "dependent"]
+
+
+def test_run_checks_depends_on_blocked() -> None:
+    ran: list[str] = []
+
+    def dependent() -> tuple[bool, str]:
+        ran.append("dependent")
+        return True, ""
+
+    prerequisite = doctor.Check(failing_check)
+    first_check = _check("dependent", dependent, {prerequisite.name})
+    second_check = _check("transitive", dependent, {"dependent"})
+    assert doctor.run_checks(
+        [prerequisite, first_check, second_check], ThreadPoolExecutor()
+    ) == {
+        prerequisite: (False, ""),
+        first_check: (False, "Blocked by failing check(s): failing check"),
+        second_check: (False, "Blocked by failing check(s): dependent"),
+    }
+    assert ran == []
+
+
+def test_run_checks_depends_on_skipped() -> None:
+    prerequisite = doctor.Check(passing_check)
+    check = _check("dependent", passing_check.check, {prerequisite.name})
+    assert doctor.run_checks(
+        [prerequisite, check], ThreadPoolExecutor(), skip=[prerequisite]
+    ) == {check: (False, "Blocked by failing check(s): passing check")}
+
+
+def test_run_checks_depends_on_cycle() -> None:
+    first_check = _check("a", passing_check.check, {"b"})
+    second_check = _check("b", passing_check.check, {"a"})
+    third_check = doctor.Check(passing_check)
+    assert doctor.run_checks(
+        [first_check, second_check, third_check], ThreadPoolExecutor()
+    ) == {
+        first_check: (False, "Check is part of a depends_on cycle"),
+        second_check: (False, "Check is part of a depends_on cycle"),
+        third_check: (True, ""),
+    }
+
+
+def test_check_depends_on() -> None:
+    assert doctor.Check(passing_check).depends_on == set()
+    with pytest.raises(ValueError):
+        _check("a", passing_check.check, ["b"])  # type: ignore
+
+
+def _sleep_check() -> tuple[bool, str]:
+    proc.run(("sleep", "60"))
+    return True, ""
+
+
+def test_run_checks_timeout() -> None:
+    slow_check = _check("slow", _sleep_check)
+    slow_check.timeout = 0.1
+    check = doctor.Check(passing_check)
+
+    start = time.monotonic()
+    results = doctor.run_checks(
+        [slow_check, check], ThreadPoolExecutor(), check_timeout=30
+    )
+    assert time.monotonic() - start < 10
+
+    assert results[check] == (True, "")
+    ok, msg = results[slow_check]
+    assert not ok
+    assert msg.startswith("Check timed out after 0.")
+
+
+def test_run_checks_default_timeout() -> None:
+    slow_check = _check("slow", _sleep_check)
+    results = doctor.run_checks(
+        [slow_check], ThreadPoolExecutor(), check_timeout=0.1
+    )
+    assert not results[slow_check][0]
+
+
+def test_run_checks_total_timeout() -> None:
+    slow_check = _check("slow", _sleep_check)
+    dependent = _check("dependent", passing_check.check, {"slow"})
+    results = doctor.run_checks(
+        [slow_check, dependent], ThreadPoolExecutor(), timeout=0.1
+    )
+    assert results[slow_check][1].startswith("Check timed out after")
+    assert results[dependent] == (False, "Check didn't run, doctor timed out")
+
+
+def test_check_timeout() -> None:
+    assert doctor.Check(passing_check).timeout is None
+    with pytest.raises(ValueError):
+        module = types.ModuleType("m")
+        module.__dict__.update(passing_check.__dict__, timeout=0)
+        doctor.Check(module)
+
+
+def _concurrency_checks(
+    n: int, resources: set[str] | None = None
+) -> tuple[list[doctor.Check], list[int]]:
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def check() -> tuple[bool, str]:
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return True, ""
+
+    checks = []
+    for i in range(n):
+        c = _check(f"check {i}", check)
+        c.resources = resources or set()
+        checks.append(c)
+    return checks, peak
+
+
+def test_run_checks_max_workers() -> None:
+    checks, peak = _concurrency_checks(6)
+    results = doctor.run_checks(checks, ThreadPoolExecutor(), max_workers=2)
+    assert all(ok for ok, _ in results.values())
+    assert peak[0] == 2
+
+
+def test_run_checks_limits() -> None:
+    docker_checks, peak = _concurrency_checks(3, {"docker"})
+    other_checks, _ = _concurrency_checks(3)
+    results = doctor.run_checks(
+        [*docker_checks, *other_checks],
+        ThreadPoolExecutor(),
+        max_workers=4,
+        limits={"docker": 1},
+    )
+    assert len(results) == 6
+    assert all(ok for ok, _ in results.values())
+    assert peak[0] == 1
+
+
+def test_check_resources() -> None:
+    assert doctor.Check(passing_check).resources == set()
+    with pytest.raises(ValueError):
+        module = types.ModuleType("m")
+        module.__dict__.update(passing_check.__dict__, resources=["docker"])
+        doctor.Check(module)
+
+
+def test_run_checks_timeout_abandoned() -> None:
+    def hung() -> tuple[bool, str]:
+        time.sleep(5)
+        return True, ""
+
+    slow_check = _check("slow", hung)
+    slow_check.timeout = 0.1
+
+    start = time.monotonic()
+    executor = tasks.DaemonExecutor()
+    results = doctor.run_checks([slow_check], executor)
+    executor.shutdown()
+    assert time.monotonic() - start < 2
+    assert not results[slow_check][0]
+
+
+def _running(pid: int) -> bool:
+    # (zombies don't count, whatever reaps them might take a while)
+    stat = subprocess.run(
+        ("ps", "-o", "stat=", "-p", f"{pid}"), capture_output=True, text=True
+    ).stdout.strip()
+    return bool(stat) and not stat.startswith("Z")
+
+
+def test_run_checks_interrupted(tmp_path: pathlib.Path) -> None:
+    pidfile = tmp_path / "pid"
+
+    def check() -> tuple[bool, str]:
+        proc.run(("sh", "-c", f"echo $$ > {pidfile}; exec sleep 60"))
+        return True, ""
+
+    def interrupted_wait(*args: object, **kwargs: object) -> None:
+        while not pidfile.exists() or not pidfile.read_text():
+            time.sleep(0.01)
+        raise KeyboardInterrupt
+
+    with (
+        mock.patch.object(doctor, "wait", side_effect=interrupted_wait),
+        pytest.raises(KeyboardInterrupt),
+    ):
+        doctor.run_checks([_check("a", check)], tasks.DaemonExecutor())
+
+    pid = int(pidfile.read_text())
+    for _ in range(500):
+        if not _running(pid):
+            break
+        time.sleep(0.01)
+    else:
+        raise AssertionError("the check's subprocess is still running")
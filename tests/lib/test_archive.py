@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import bz2
+import gzip
+import hashlib
 import io
+import lzma
 import os
 import pathlib
+import shutil
+import subprocess
 import tarfile
 import time
 import typing
@@ -12,6 +18,12 @@ from unittest import mock
 import pytest
 
 from devenv.lib import archive
+from devenv.lib import cache
+from devenv.lib import config
+from devenv.lib import httppool
+from devenv.lib import mirror
+from devenv.lib import offline
+from tests.utils import Response
 from tests.utils import sorted_os_walk
 
 
@@ -155,6 +167,28 @@ def mock_sleep() -> typing.Generator[mock.MagicMock, None, None]:
         yield mock_sleep
 
 
+@pytest.fixture(params=("stdlib", "external"))
+def decompressors(
+    request: pytest.FixtureRequest,
+) -> typing.Generator[str, None, None]:
+    if request.param == "stdlib":
+        with mock.patch.dict(archive.DECOMPRESSORS, clear=True):
+            yield request.param
+    else:
+        # gzip stands in for pigz, which usually isn't installed
+        with mock.patch.dict(archive.DECOMPRESSORS, {"gz": (("gzip", "-dc"),)}):
+            yield request.param
+
+
+@pytest.fixture(autouse=True)
+def cache_root(
+    tmp_path_factory: pytest.TempPathFactory,
+) -> typing.Generator[pathlib.Path, None, None]:
+    cache_root = tmp_path_factory.mktemp("cache")
+    with mock.patch.object(cache, "cache_root", f"{cache_root}"):
+        yield cache_root
+
+
 def test_download(tmp_path: pathlib.Path, mock_sleep: mock.MagicMock) -> None:
     data = b"foo\n"
     data_sha256 = (
@@ -177,10 +211,10 @@ def test_download(tmp_path: pathlib.Path, mock_sleep: mock.MagicMock) -> None:
     os.symlink(f"{tmp_path}/hi", dest)
 
     with mock.patch.object(
-        urllib.request,
+        httppool,
         "urlopen",
         autospec=True,
-        side_effect=(err, err, err, io.BytesIO(data)),
+        side_effect=(err, err, err, Response(data)),
     ):
         archive.download("https://example.com/foo", data_sha256, dest)
 
@@ -211,10 +245,7 @@ def test_download_exceeded_retries(
     dest = f"{tmp_path}/a"
     with pytest.raises(RuntimeError) as excinfo:
         with mock.patch.object(
-            urllib.request,
-            "urlopen",
-            autospec=True,
-            side_effect=(err, err, err, err),
+            httppool, "urlopen", autospec=True, side_effect=(err, err, err, err)
         ):
             archive.download("https://example.com/foo", data_sha256, dest)
 
@@ -239,10 +270,7 @@ def test_download_dest_is_broken_symlink(
     os.symlink(f"{tmp_path}/does-not-exist", dest)
 
     with mock.patch.object(
-        urllib.request,
-        "urlopen",
-        autospec=True,
-        side_effect=(io.BytesIO(data),),
+        httppool, "urlopen", autospec=True, side_effect=(Response(data),)
     ):
         archive.download("https://example.com/foo", data_sha256, dest)
 
@@ -262,10 +290,7 @@ def test_download_wrong_sha(
 
     with pytest.raises(RuntimeError) as excinfo:
         with mock.patch.object(
-            urllib.request,
-            "urlopen",
-            autospec=True,
-            side_effect=(io.BytesIO(data),),
+            httppool, "urlopen", autospec=True, side_effect=(Response(data),)
         ):
             archive.download("https://example.com/foo", "wrong sha", dest)
 
@@ -379,3 +404,775 @@ def test_unpack_strip_n_symlink(
         # baz (-> bar)
         (f"{dest}", [], ["bar", "baz"])
     ]
+
+
+def test_unpack_strip_n_hardlink_prefix(
+    tar5: pathlib.Path, tmp_path: pathlib.Path
+) -> None:
+    dest = tmp_path / "dest"
+    archive.unpack_strip_n(str(tar5), str(dest), n=1, new_prefix="x")
+
+    assert [*sorted_os_walk(dest)] == [
+        (f"{dest}", ["x"], []),
+        (f"{dest}/x", [], ["bar", "baz"]),
+    ]
+    assert os.path.samefile(f"{dest}/x/bar", f"{dest}/x/baz")
+
+
+def test_unpack_readonly_dir(tmp_path: pathlib.Path) -> None:
+    tar = tmp_path / "tar"
+    with tarfile.open(tar, "w:gz") as tarf:
+        foo = tarfile.TarInfo("foo")
+        foo.type = tarfile.DIRTYPE
+        foo.mode = 0o555
+        tarf.addfile(foo)
+        tarf.addfile(tarfile.TarInfo("foo/bar"), io.BytesIO(b""))
+
+    dest = tmp_path / "dest"
+    archive.unpack(str(tar), str(dest))
+
+    assert [*sorted_os_walk(dest)] == [
+        (f"{dest}", ["foo"], []),
+        (f"{dest}/foo", [], ["bar"]),
+    ]
+    assert os.stat(f"{dest}/foo").st_mode & 0o777 == 0o555
+    os.chmod(f"{dest}/foo", 0o755)
+
+
+def test_download_small_bufsize(
+    tmp_path: pathlib.Path, mock_sleep: mock.MagicMock
+) -> None:
+    data = b"foo\n" * 1000
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    dest = f"{tmp_path}/a"
+
+    with mock.patch.object(
+        httppool, "urlopen", autospec=True, side_effect=(Response(data),)
+    ):
+        archive.download(
+            "https://example.com/foo", data_sha256, dest, bufsize=7
+        )
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+
+def test_download_wrong_sha_cleans_up(
+    tmp_path: pathlib.Path, mock_sleep: mock.MagicMock
+) -> None:
+    dest = f"{tmp_path}/a"
+
+    with pytest.raises(RuntimeError):
+        with mock.patch.object(
+            httppool,
+            "urlopen",
+            autospec=True,
+            side_effect=(Response(b"foo\n"),),
+        ):
+            archive.download("https://example.com/foo", "wrong sha", dest)
+
+    # the temporary file shouldn't be left behind
+    assert os.listdir(tmp_path) == []
+
+
+def test_download_resume_interrupted(
+    tmp_path: pathlib.Path, mock_sleep: mock.MagicMock
+) -> None:
+    data = b"foo\n" * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    dest = f"{tmp_path}/a"
+
+    with mock.patch.object(
+        httppool,
+        "urlopen",
+        autospec=True,
+        side_effect=(
+            Response(data, headers={"ETag": '"v1"'}, fail_after=6),
+            Response(data[6:], status=206),
+        ),
+    ) as mock_urlopen:
+        archive.download(
+            "https://example.com/foo", data_sha256, dest, bufsize=4
+        )
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+    req = mock_urlopen.mock_calls[1].args[0]
+    assert req.get_header("Range") == "bytes=6-"
+    assert req.get_header("If-range") == '"v1"'
+    assert mock_sleep.mock_calls == [mock.call(1.0)]
+
+
+def test_download_resume_partial(
+    tmp_path: pathlib.Path, cache_root: pathlib.Path
+) -> None:
+    data = b"foo\n" * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    # left behind by a previous devenv
+    partial = cache_root / f"{data_sha256}.partial"
+    partial.write_bytes(data[:5])
+    (cache_root / f"{data_sha256}.partial.json").write_text(
+        '{"url": "https://example.com/foo", "validator": "yesterday"}'
+    )
+
+    dest = f"{tmp_path}/a"
+
+    with mock.patch.object(
+        httppool,
+        "urlopen",
+        autospec=True,
+        side_effect=(Response(data[5:], status=206),),
+    ) as mock_urlopen:
+        archive.download("https://example.com/foo", data_sha256, dest)
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+    req = mock_urlopen.mock_calls[0].args[0]
+    assert req.get_header("Range") == "bytes=5-"
+    assert req.get_header("If-range") == "yesterday"
+
+    # cleaned up after success
+    assert os.listdir(cache_root) == []
+
+
+def test_download_resume_ignored(
+    tmp_path: pathlib.Path, cache_root: pathlib.Path
+) -> None:
+    data = b"foo\n" * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    partial = cache_root / f"{data_sha256}.partial"
+    partial.write_bytes(b"garbage")
+    (cache_root / f"{data_sha256}.partial.json").write_text(
+        '{"url": "https://example.com/foo", "validator": ""}'
+    )
+
+    dest = f"{tmp_path}/a"
+
+    # server doesn't support ranges and sends everything
+    with mock.patch.object(
+        httppool, "urlopen", autospec=True, side_effect=(Response(data),)
+    ):
+        archive.download("https://example.com/foo", data_sha256, dest)
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+
+def test_download_keeps_partial(
+    tmp_path: pathlib.Path, cache_root: pathlib.Path, mock_sleep: mock.MagicMock
+) -> None:
+    data = b"foo\n" * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    dest = f"{tmp_path}/a"
+
+    with pytest.raises(RuntimeError):
+        with mock.patch.object(
+            httppool,
+            "urlopen",
+            autospec=True,
+            side_effect=(Response(data, fail_after=3),),
+        ):
+            archive.download(
+                "https://example.com/foo", data_sha256, dest, retries=0
+            )
+
+    assert not os.path.exists(dest)
+    partial = cache_root / f"{data_sha256}.partial"
+    assert partial.read_bytes() == data[:3]
+
+
+def _ranged_urlopen(
+    data: bytes, fail_range: str = ""
+) -> typing.Callable[[urllib.request.Request, float | None], Response]:
+    headers = {"Content-Length": f"{len(data)}", "Accept-Ranges": "bytes"}
+
+    def urlopen(
+        req: urllib.request.Request, timeout: float | None = None
+    ) -> Response:
+        r = req.get_header("Range")
+        if r is None:
+            return Response(data, headers=headers)
+        if r == fail_range:
+            raise ConnectionResetError("connection reset by peer")
+        start, end = (int(x) for x in r.removeprefix("bytes=").split("-"))
+        return Response(data[start : end + 1], status=206)
+
+    return urlopen
+
+
+def test_download_parallel(
+    tmp_path: pathlib.Path, cache_root: pathlib.Path
+) -> None:
+    data = bytes(range(256)) * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    dest = f"{tmp_path}/a"
+
+    with mock.patch.object(
+        httppool, "urlopen", autospec=True, side_effect=_ranged_urlopen(data)
+    ) as mock_urlopen:
+        archive.download(
+            "https://example.com/foo",
+            data_sha256,
+            dest,
+            bufsize=100,
+            chunks=3,
+            min_chunk_size=256,
+        )
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+    assert sorted(
+        f"{call.args[0].get_header('Range')}"
+        for call in mock_urlopen.mock_calls
+    ) == ["None", "bytes=341-681", "bytes=682-1023"]
+    assert os.listdir(cache_root) == []
+
+
+def test_download_parallel_below_threshold(tmp_path: pathlib.Path) -> None:
+    data = bytes(range(256)) * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    dest = f"{tmp_path}/a"
+
+    with mock.patch.object(
+        httppool, "urlopen", autospec=True, side_effect=_ranged_urlopen(data)
+    ) as mock_urlopen:
+        archive.download(
+            "https://example.com/foo",
+            data_sha256,
+            dest,
+            chunks=3,
+            min_chunk_size=1024,
+        )
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+    assert len(mock_urlopen.mock_calls) == 1
+
+
+def test_download_parallel_failed_segment(
+    tmp_path: pathlib.Path, cache_root: pathlib.Path, mock_sleep: mock.MagicMock
+) -> None:
+    data = bytes(range(256)) * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    dest = f"{tmp_path}/a"
+
+    with pytest.raises(RuntimeError):
+        with mock.patch.object(
+            httppool,
+            "urlopen",
+            autospec=True,
+            side_effect=_ranged_urlopen(data, fail_range="bytes=682-1023"),
+        ):
+            archive.download(
+                "https://example.com/foo",
+                data_sha256,
+                dest,
+                retries=0,
+                chunks=3,
+                min_chunk_size=256,
+            )
+
+    # only the contiguous head is kept for resuming
+    partial = cache_root / f"{data_sha256}.partial"
+    assert partial.read_bytes() == data[:341]
+
+
+def test_download_parallel_config(
+    tmp_path: pathlib.Path, cache_root: pathlib.Path
+) -> None:
+    data = bytes(range(256)) * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    global_config = tmp_path / "config.ini"
+    global_config.write_text("[download]\nchunks = 2\nmin_chunk_size = 0.25K\n")
+
+    dest = f"{tmp_path}/a"
+
+    with (
+        mock.patch.object(config, "global_config_path", f"{global_config}"),
+        mock.patch.object(
+            httppool,
+            "urlopen",
+            autospec=True,
+            side_effect=_ranged_urlopen(data),
+        ) as mock_urlopen,
+    ):
+        archive.download("https://example.com/foo", data_sha256, dest)
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+    assert len(mock_urlopen.mock_calls) == 2
+
+
+def test_unpack_cached(
+    tgz: pathlib.Path, tmp_path: pathlib.Path, cache_root: pathlib.Path
+) -> None:
+    data = tgz.read_bytes()
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    with (
+        mock.patch.object(
+            httppool, "urlopen", autospec=True, side_effect=(Response(data),)
+        ) as mock_urlopen,
+        mock.patch.object(
+            cache, "record_tree", wraps=cache.record_tree
+        ) as mock_record_tree,
+    ):
+        for dest in ("a", "b"):
+            archive.unpack_cached(
+                "https://example.com/foo",
+                data_sha256,
+                f"{tmp_path}/{dest}",
+                n=1,
+                new_prefix="node",
+            )
+
+    # the second one came straight from the unpacked tree
+    assert len(mock_urlopen.mock_calls) == 1
+
+    for name in ("a", "b"):
+        dest = tmp_path / name
+        assert [*sorted_os_walk(dest)] == [
+            (f"{dest}", ["node"], []),
+            (f"{dest}/node", ["bin"], ["baz"]),
+            (f"{dest}/node/bin", [], ["foo"]),
+        ]
+
+    tree = cache.tree_path(data_sha256, 1)
+    assert os.path.samefile(f"{tree}/bin/foo", f"{tmp_path}/a/node/bin/foo")
+    # counted against the cache's budget
+    mock_record_tree.assert_called_once_with(data_sha256, tree)
+
+    # trees go along with their archive
+    cache.prune(0)
+    assert not os.path.exists(tree)
+
+
+def test_unpack_include(tgz: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    dest = tmp_path / "dest"
+    archive.unpack(str(tgz), str(dest), perform_strip1=True, include=("bin/*",))
+    assert [*sorted_os_walk(dest)] == [
+        (f"{dest}", ["bin"], []),
+        (f"{dest}/bin", [], ["foo"]),
+    ]
+
+    dest2 = tmp_path / "dest2"
+    archive.unpack_strip_n(
+        str(tgz), str(dest2), n=1, new_prefix="x", include=("baz",)
+    )
+    assert [*sorted_os_walk(dest2)] == [
+        (f"{dest2}", ["x"], []),
+        (f"{dest2}/x", [], ["baz"]),
+    ]
+
+
+def test_extract(
+    tgz: pathlib.Path, tmp_path: pathlib.Path, decompressors: str
+) -> None:
+    dest = tmp_path / "dest"
+    archive.extract(
+        str(tgz), {"bin/foo": f"{dest}/foo", "baz": f"{dest}/nested/baz"}, n=1
+    )
+    assert [*sorted_os_walk(dest)] == [
+        (f"{dest}", ["nested"], ["foo"]),
+        (f"{dest}/nested", [], ["baz"]),
+    ]
+
+    with pytest.raises(RuntimeError) as excinfo:
+        archive.extract(str(tgz), {"bin/bar": f"{dest}/bar"}, n=1)
+    assert f"{excinfo.value}" == f"{tgz} is missing bin/bar"
+
+    with pytest.raises(RuntimeError) as excinfo:
+        archive.extract(str(tgz), {"bin": f"{dest}/bin"}, n=1)
+    assert f"{excinfo.value}" == "bin isn't a regular file"
+
+
+def test_download_and_unpack(
+    tgz: pathlib.Path,
+    tmp_path: pathlib.Path,
+    cache_root: pathlib.Path,
+    decompressors: str,
+) -> None:
+    data = tgz.read_bytes()
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    dest = tmp_path / "dest"
+    with mock.patch.object(
+        httppool, "urlopen", autospec=True, side_effect=(Response(data),)
+    ):
+        archive.download_and_unpack(
+            "https://example.com/foo", data_sha256, f"{dest}", n=1, bufsize=7
+        )
+
+    assert [*sorted_os_walk(dest)] == [
+        (f"{dest}", ["bin"], ["baz"]),
+        (f"{dest}/bin", [], ["foo"]),
+    ]
+
+    # the archive was saved along the way
+    with open(cache.path(data_sha256), "rb") as f:
+        assert f.read() == data
+
+    # ...and is used from then on
+    dest2 = tmp_path / "dest2"
+    archive.download_and_unpack(
+        "https://example.com/foo", data_sha256, f"{dest2}", n=1
+    )
+    assert [*sorted_os_walk(dest2)] == [
+        (f"{dest2}", ["bin"], ["baz"]),
+        (f"{dest2}/bin", [], ["foo"]),
+    ]
+
+
+def test_download_and_unpack_wrong_sha(
+    tgz: pathlib.Path, tmp_path: pathlib.Path, cache_root: pathlib.Path
+) -> None:
+    data = tgz.read_bytes()
+
+    with mock.patch.object(
+        httppool, "urlopen", autospec=True, side_effect=(Response(data),)
+    ):
+        with pytest.raises(RuntimeError) as excinfo:
+            archive.download_and_unpack(
+                "https://example.com/foo", "0" * 64, f"{tmp_path}/dest"
+            )
+
+    assert f"{excinfo.value}".startswith("checksum mismatch")
+    assert not os.path.exists(f"{tmp_path}/dest")
+    # neither the staging dir nor the archive were kept
+    assert sorted(os.listdir(tmp_path)) == ["foo-v1", "tgz"]
+    assert sorted(os.listdir(cache_root)) == []
+
+
+def test_download_and_unpack_fallback(
+    tgz: pathlib.Path,
+    tmp_path: pathlib.Path,
+    cache_root: pathlib.Path,
+    mock_sleep: mock.MagicMock,
+    decompressors: str,
+) -> None:
+    data = tgz.read_bytes()
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    dest = tmp_path / "dest"
+    with mock.patch.object(
+        httppool,
+        "urlopen",
+        autospec=True,
+        side_effect=(Response(data, fail_after=20), Response(data)),
+    ):
+        archive.download_and_unpack(
+            "https://example.com/foo", data_sha256, f"{dest}", n=1
+        )
+
+    assert [*sorted_os_walk(dest)] == [
+        (f"{dest}", ["bin"], ["baz"]),
+        (f"{dest}/bin", [], ["foo"]),
+    ]
+    assert os.path.exists(cache.path(data_sha256))
+
+
+@pytest.mark.parametrize("compression", ("gz", "xz", "bz2", "zst"))
+def test_unpack_compressed(
+    tar2: pathlib.Path,
+    tmp_path: pathlib.Path,
+    compression: str,
+    decompressors: str,
+) -> None:
+    if decompressors == "external":
+        for cmd in archive.DECOMPRESSORS.get(compression, ()):
+            if shutil.which(cmd[0]) is None:
+                pytest.skip(f"{cmd[0]} isn't installed")
+    elif compression == "zst":
+        pytest.skip("the stdlib can't decompress zstd")
+
+    compressed = tmp_path / f"tar.{compression}"
+    if compression == "zst":
+        subprocess.run(
+            ("zstd", "-q", str(tar2), "-o", str(compressed)), check=True
+        )
+    else:
+        compress = {"gz": gzip, "xz": lzma, "bz2": bz2}[compression].compress
+        compressed.write_bytes(compress(tar2.read_bytes()))
+
+    dest = tmp_path / "dest"
+    archive.unpack_strip_n(str(compressed), str(dest), n=2, new_prefix="x")
+    assert [*sorted_os_walk(dest)] == [
+        (f"{dest}", ["x"], []),
+        (f"{dest}/x", ["baz", "bin"], []),
+        (f"{dest}/x/baz", [], []),
+        (f"{dest}/x/bin", [], ["foo"]),
+    ]
+
+
+@pytest.mark.parametrize("compression", ("gz", "xz", "bz2"))
+def test_unpack_truncated(tmp_path: pathlib.Path, compression: str) -> None:
+    tar = io.BytesIO()
+    with tarfile.open(fileobj=tar, mode="w") as tarf:
+        for i in range(200):
+            data = f"{i}\n".encode() * 100
+            info = tarfile.TarInfo(f"src/{i}")
+            info.size = len(data)
+            tarf.addfile(info, io.BytesIO(data))
+
+    compress = {"gz": gzip, "xz": lzma, "bz2": bz2}[compression].compress
+    data = compress(tar.getvalue())
+    compressed = tmp_path / f"tar.{compression}"
+    # (for gz and xz this happens to end between members, which tarfile
+    # alone takes for the end of the archive)
+    compressed.write_bytes(data[: len(data) // 4])
+
+    with (
+        mock.patch.dict(archive.DECOMPRESSORS, clear=True),
+        pytest.raises(EOFError),
+    ):
+        archive.unpack_strip_n(str(compressed), str(tmp_path / "dest"), n=1)
+
+    cmd = {"gz": "gzip", "xz": "xz", "bz2": "bzip2"}[compression]
+    if shutil.which(cmd) is None:
+        pytest.skip(f"{cmd} isn't installed")
+    with (
+        mock.patch.dict(archive.DECOMPRESSORS, {compression: ((cmd, "-dc"),)}),
+        pytest.raises(tarfile.ReadError),
+    ):
+        archive.unpack_strip_n(str(compressed), str(tmp_path / "dest2"), n=1)
+
+
+def test_unpack_zst_unsupported(tmp_path: pathlib.Path) -> None:
+    compressed = tmp_path / "tar.zst"
+    compressed.write_bytes(b"\x28\xb5\x2f\xfd" + b"\0" * 16)
+
+    with mock.patch.dict(archive.DECOMPRESSORS, clear=True):
+        with pytest.raises(RuntimeError) as excinfo:
+            archive.unpack(str(compressed), f"{tmp_path}/dest")
+
+    assert (
+        f"{excinfo.value}"
+        == "zstd-compressed archives need zstd, run `brew install zstd`"
+    )
+
+
+def test_download_offline(
+    tmp_path: pathlib.Path, cache_root: pathlib.Path, mock_sleep: mock.MagicMock
+) -> None:
+    data = b"foo\n"
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    with (
+        mock.patch.object(offline, "enabled", True),
+        mock.patch.object(httppool, "urlopen", autospec=True) as mock_urlopen,
+    ):
+        with pytest.raises(RuntimeError) as excinfo:
+            archive.download("https://example.com/foo", data_sha256)
+        assert f"{excinfo.value}".startswith(
+            f"https://example.com/foo ({data_sha256}) isn't in the download cache"
+        )
+
+        with pytest.raises(RuntimeError):
+            archive.download_and_unpack(
+                "https://example.com/foo", data_sha256, f"{tmp_path}/dest"
+            )
+
+        # but anything that's cached is fine, even if it's wanted elsewhere
+        (cache_root / data_sha256).write_bytes(data)
+        dest = f"{tmp_path}/dest"
+        assert archive.download("https://example.com/foo", data_sha256, dest)
+        with open(dest, "rb") as f:
+            assert f.read() == data
+
+    # and nothing ever tried the network or waited to retry
+    assert mock_urlopen.mock_calls == []
+    assert mock_sleep.mock_calls == []
+
+
+def _mirror_config(tmp_path: pathlib.Path) -> str:
+    global_config = tmp_path / "config.ini"
+    global_config.write_text("""
+[mirror]
+rewrite =
+    https://example.com/ https://proxy.example.com/
+mirrors =
+    https://mirror1.example.com
+    https://mirror2.example.com/
+""")
+    return f"{global_config}"
+
+
+def test_download_mirrors(tmp_path: pathlib.Path) -> None:
+    data = b"foo\n"
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    def urlopen(
+        req: urllib.request.Request, timeout: float | None = None
+    ) -> Response:
+        if req.full_url == "https://proxy.example.com/foo":
+            raise urllib.error.URLError("nope")
+        if req.full_url == f"https://mirror1.example.com/{data_sha256}":
+            return Response(b"not foo\n")
+        if req.full_url == f"https://mirror2.example.com/{data_sha256}":
+            return Response(data)
+        raise AssertionError(req.full_url)
+
+    with (
+        mock.patch.object(
+            config, "global_config_path", _mirror_config(tmp_path)
+        ),
+        mock.patch.object(mirror, "_unreachable", set()),
+        mock.patch.object(
+            httppool, "urlopen", autospec=True, side_effect=urlopen
+        ) as mock_urlopen,
+    ):
+        dest = archive.download("https://example.com/foo", data_sha256)
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+    assert cache.entries()[data_sha256].url == "https://example.com/foo"
+    assert [c.args[0].full_url for c in mock_urlopen.mock_calls] == [
+        "https://proxy.example.com/foo",
+        f"https://mirror1.example.com/{data_sha256}",
+        f"https://mirror2.example.com/{data_sha256}",
+    ]
+    # mirrors don't get to hang
+    assert {c.args[1] for c in mock_urlopen.mock_calls} == {
+        mirror.DEFAULT_TIMEOUT
+    }
+
+
+def test_download_mirrors_fallback_to_origin(
+    tmp_path: pathlib.Path, mock_sleep: mock.MagicMock
+) -> None:
+    data = b"foo\n"
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    def urlopen(
+        req: urllib.request.Request, timeout: float | None = None
+    ) -> Response:
+        if req.full_url == "https://example.com/foo":
+            return Response(data)
+        raise urllib.error.HTTPError(
+            req.full_url,
+            404,
+            "Not Found",
+            "",  # type: ignore
+            io.BytesIO(b""),
+        )
+
+    with (
+        mock.patch.object(
+            config, "global_config_path", _mirror_config(tmp_path)
+        ),
+        mock.patch.object(mirror, "_unreachable", set()),
+        mock.patch.object(
+            httppool, "urlopen", autospec=True, side_effect=urlopen
+        ) as mock_urlopen,
+    ):
+        dest = archive.download("https://example.com/foo", data_sha256)
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+    assert len(mock_urlopen.mock_calls) == 4
+    # mirrors aren't retried
+    mock_sleep.assert_not_called()
+
+
+def test_download_mirrors_unreachable(
+    tmp_path: pathlib.Path, mock_sleep: mock.MagicMock
+) -> None:
+    data = b"foo\n"
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    def urlopen(
+        req: urllib.request.Request, timeout: float | None = None
+    ) -> Response:
+        if req.full_url.startswith("https://mirror1.example.com/"):
+            raise TimeoutError("timed out")
+        if req.full_url.startswith("https://example.com/"):
+            return Response(data)
+        raise urllib.error.HTTPError(
+            req.full_url,
+            404,
+            "Not Found",
+            "",  # type: ignore
+            io.BytesIO(b""),
+        )
+
+    with (
+        mock.patch.object(
+            config, "global_config_path", _mirror_config(tmp_path)
+        ),
+        mock.patch.object(mirror, "_unreachable", set()),
+        mock.patch.object(
+            httppool, "urlopen", autospec=True, side_effect=urlopen
+        ) as mock_urlopen,
+    ):
+        archive.download(
+            "https://example.com/foo", data_sha256, f"{tmp_path}/a"
+        )
+        mock_urlopen.reset_mock()
+        archive.download(
+            "https://example.com/bar", data_sha256, f"{tmp_path}/b"
+        )
+
+    # mirror1 timed out the first time around, so it's not tried again
+    # (a 404 only means that mirror doesn't have that one)
+    assert [c.args[0].full_url for c in mock_urlopen.mock_calls] == [
+        "https://proxy.example.com/bar",
+        f"https://mirror2.example.com/{data_sha256}",
+        "https://example.com/bar",
+    ]
+
+
+def test_download_mirrors_keep_partial(
+    tmp_path: pathlib.Path, cache_root: pathlib.Path
+) -> None:
+    data = b"foo\n" * 4
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    # left behind by a previous devenv
+    partial = cache_root / f"{data_sha256}.partial"
+    partial.write_bytes(data[:5])
+    (cache_root / f"{data_sha256}.partial.json").write_text(
+        '{"url": "https://example.com/foo", "validator": "yesterday"}'
+    )
+
+    def urlopen(
+        req: urllib.request.Request, timeout: float | None = None
+    ) -> Response:
+        if req.full_url == "https://example.com/foo":
+            return Response(data[5:], status=206)
+        raise urllib.error.URLError("nope")
+
+    with (
+        mock.patch.object(
+            config, "global_config_path", _mirror_config(tmp_path)
+        ),
+        mock.patch.object(mirror, "_unreachable", set()),
+        mock.patch.object(
+            httppool, "urlopen", autospec=True, side_effect=urlopen
+        ) as mock_urlopen,
+    ):
+        archive.download(
+            "https://example.com/foo", data_sha256, f"{tmp_path}/a"
+        )
+
+    with open(f"{tmp_path}/a", "rb") as f:
+        assert f.read() == data
+
+    # failed mirrors didn't touch what was already downloaded from origin
+    req = mock_urlopen.mock_calls[-1].args[0]
+    assert req.full_url == "https://example.com/foo"
+    assert req.get_header("Range") == "bytes=5-"
+    assert req.get_header("If-range") == "yesterday"
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+import pathlib
+import time
+import typing
+from unittest import mock
+
+import pytest
+
+from devenv.lib import archive
+from devenv.lib import cache
+from devenv.lib import httppool
+from tests.utils import Response
+
+
+@pytest.fixture(autouse=True)
+def cache_root(
+    tmp_path: pathlib.Path,
+) -> typing.Generator[pathlib.Path, None, None]:
+    cache_root = tmp_path / "cache"
+    cache_root.mkdir()
+    with mock.patch.object(cache, "cache_root", f"{cache_root}"):
+        yield cache_root
+
+
+def _put(cache_root: pathlib.Path, data: bytes) -> str:
+    sha256 = hashlib.sha256(data).hexdigest()
+    (cache_root / sha256).write_bytes(data)
+    return sha256
+
+
+def test_record_evicts_lru(cache_root: pathlib.Path) -> None:
+    with (
+        mock.patch.object(cache, "max_size", return_value=10),
+        mock.patch.object(time, "time", side_effect=(1.0, 2.0, 3.0, 4.0)),
+    ):
+        a = _put(cache_root, b"aaaa")
+        cache.record(a, "https://example.com/a")
+        b = _put(cache_root, b"bbbb")
+        cache.record(b, "https://example.com/b")
+
+        # a was used more recently than b
+        cache.touch(a)
+
+        c = _put(cache_root, b"cccc")
+        cache.record(c, "https://example.com/c")
+
+    assert not (cache_root / b).exists()
+    assert cache.entries() == {
+        a: cache.Entry(size=4, atime=3.0, url="https://example.com/a"),
+        c: cache.Entry(size=4, atime=4.0, url="https://example.com/c"),
+    }
+
+
+def test_entries_rescans(cache_root: pathlib.Path) -> None:
+    # downloaded by an older devenv, so it isn't indexed
+    a = _put(cache_root, b"aaaa")
+    # not cache entries
+    (cache_root / f"{a}.partial").write_bytes(b"aa")
+    (cache_root / "junk").write_bytes(b"junk")
+
+    assert cache.entries().keys() == {a}
+
+    (cache_root / a).unlink()
+    assert cache.entries() == {}
+
+
+def test_prune(cache_root: pathlib.Path) -> None:
+    a = _put(cache_root, b"aaaa")
+    b = _put(cache_root, b"bbbb")
+
+    assert cache.prune(4) in ([a], [b])
+    assert len(cache.entries()) == 1
+
+    cache.prune(0)
+    assert cache.entries() == {}
+
+
+def test_verify(cache_root: pathlib.Path) -> None:
+    a = _put(cache_root, b"aaaa")
+    b = _put(cache_root, b"bbbb")
+    (cache_root / b).write_bytes(b"corrupted")
+
+    assert cache.verify() == [b]
+    assert cache.entries().keys() == {a}
+
+
+def test_prune_partials(cache_root: pathlib.Path) -> None:
+    a = _put(cache_root, b"aaaa")
+    # abandoned a while ago
+    abandoned = cache_root / f"{a[::-1]}.partial"
+    abandoned.write_bytes(b"b" * 10)
+    os.utime(abandoned, (0, 0))
+    (cache_root / f"{a[::-1]}.partial.json").write_text("{}")
+    # being downloaded into
+    downloading = cache_root / f"{a[:-1]}0.mirror.partial"
+    downloading.write_bytes(b"c" * 10)
+
+    with open(downloading, "rb") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        # which is enough to fit what's left
+        assert cache.prune(14) == [abandoned.name]
+
+    assert sorted(p.name for p in cache_root.iterdir()) == sorted(
+        (a, downloading.name, "index.json")
+    )
+
+
+def _put_tree(sha256: str, data: bytes) -> pathlib.Path:
+    tree = pathlib.Path(cache.tree_path(sha256))
+    (tree / "bin").mkdir(parents=True)
+    (tree / "bin/foo").write_bytes(data)
+    return tree
+
+
+def test_trees_counted(cache_root: pathlib.Path) -> None:
+    a = _put(cache_root, b"aaaa")
+    b = _put(cache_root, b"bbbb")
+    tree = _put_tree(a, b"a" * 10)
+
+    assert cache.entries()[a].trees == 10
+    assert cache.entries()[b].trees == 0
+
+    # a's archive alone would fit, but not along with its tree
+    assert cache.prune(8) == [a]
+    assert not tree.exists()
+
+
+def test_record_tree(cache_root: pathlib.Path) -> None:
+    a = _put(cache_root, b"aaaa")
+    cache.record(a, "https://example.com/a")
+    b = _put(cache_root, b"bbbb")
+    cache.record(b, "https://example.com/b")
+
+    with mock.patch.object(cache, "max_size", return_value=16):
+        cache.record_tree(b, f"{_put_tree(b, b'b' * 10)}")
+
+    # the oldest entry makes room for the new tree
+    assert cache.entries().keys() == {b}
+    assert cache.entries()[b].trees == 10
+
+
+def test_trees_in_use(cache_root: pathlib.Path) -> None:
+    a = _put(cache_root, b"aaaa")
+    tree = _put_tree(a, b"a" * 10)
+
+    # being cloned from
+    with open(f"{tree}.lock", "a") as lockf:
+        fcntl.flock(lockf, fcntl.LOCK_EX)
+        assert cache.prune(0) == [a]
+        assert tree.exists()
+
+    # its archive is gone, so the next rescan removes it
+    assert cache.entries() == {}
+    assert not tree.exists()
+
+
+def test_download_uses_cache(cache_root: pathlib.Path) -> None:
+    data = b"foo\n"
+    data_sha256 = hashlib.sha256(data).hexdigest()
+
+    with mock.patch.object(
+        httppool, "urlopen", autospec=True, side_effect=(Response(data),)
+    ):
+        dest = archive.download("https://example.com/foo", data_sha256)
+
+    assert dest == f"{cache_root}/{data_sha256}"
+    entry = cache.entries()[data_sha256]
+    assert (entry.size, entry.url) == (4, "https://example.com/foo")
+
+    # a hit is served without fetching and only bumps the access time
+    with (
+        mock.patch.object(httppool, "urlopen", autospec=True) as urlopen,
+        mock.patch.object(time, "time", return_value=entry.atime + 1),
+    ):
+        assert archive.download("https://example.com/foo", data_sha256) == dest
+
+    assert urlopen.mock_calls == []
+    assert cache.entries()[data_sha256].atime == entry.atime + 1
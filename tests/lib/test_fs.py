@@ -5,9 +5,12 @@ import os
 import pathlib
 import shutil
 import subprocess
+import timeit
+from unittest import mock
 
 import pytest
 
+from devenv.lib import fs
 from devenv.lib.fs import gitroot
 from devenv.lib.fs import write_script
 
@@ -35,6 +38,76 @@ def test_no_gitroot(tmp_path: pathlib.Path) -> None:
             gitroot()
 
 
+def test_gitroot_worktree(tmp_path: pathlib.Path) -> None:
+    repo = f"{tmp_path}/repo"
+    subprocess.run(("git", "init", "-q", repo), check=True)
+    subprocess.run(
+        (
+            "git",
+            "-C",
+            repo,
+            "-c",
+            "user.name=test",
+            "-c",
+            "user.email=test@example.com",
+            "commit",
+            "-q",
+            "--allow-empty",
+            "-m",
+            "init",
+        ),
+        check=True,
+    )
+    subprocess.run(
+        ("git", "-C", repo, "worktree", "add", "-q", f"{tmp_path}/wt"),
+        check=True,
+    )
+    os.mkdir(f"{tmp_path}/wt/foo")
+
+    with mock.patch.object(fs, "_git_gitroot") as mock_git_gitroot:
+        assert gitroot(cd=f"{tmp_path}/wt/foo") == f"{tmp_path}/wt"
+    mock_git_gitroot.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "cd", ("", "foo", "foo/bar", "foo/../foo/bar", ".git", ".git/refs")
+)
+def test_gitroot_same_as_git(tmp_path: pathlib.Path, cd: str) -> None:
+    subprocess.run(("git", "init", "-q", f"{tmp_path}"), check=True)
+    os.makedirs(f"{tmp_path}/foo/bar")
+
+    cd = os.path.join(tmp_path, cd)
+    assert gitroot(cd=cd) == fs._git_gitroot(cd)
+
+
+def test_gitroot_git_fallback(tmp_path: pathlib.Path) -> None:
+    subprocess.run(("git", "init", "-q", f"{tmp_path}"), check=True)
+
+    with (
+        mock.patch.dict(os.environ, {"GIT_DIR": f"{tmp_path}/.git"}),
+        mock.patch.object(
+            fs, "_git_gitroot", return_value="/somewhere"
+        ) as mock_git_gitroot,
+    ):
+        assert gitroot(cd=f"{tmp_path}") == "/somewhere"
+    mock_git_gitroot.assert_called_once_with(f"{tmp_path}")
+
+
+def test_gitroot_benchmark(tmp_path: pathlib.Path) -> None:
+    subprocess.run(("git", "init", "-q", f"{tmp_path}"), check=True)
+    cd = f"{tmp_path}/a/b/c/d"
+    os.makedirs(cd)
+
+    n = 20
+    python = timeit.timeit(lambda: fs._find_gitroot(cd), number=n)
+    git = timeit.timeit(lambda: fs._git_gitroot(cd), number=n)
+    print(
+        f"gitroot: {python / n * 1e6:.0f}us without git, {git / n * 1e6:.0f}us with"
+    )
+    # (it's usually a couple orders of magnitude)
+    assert python < git
+
+
 def test_write_script(tmp_path: pathlib.Path) -> None:
     binroot = f"{tmp_path}"
     shim = "shim"
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import http.server
+import threading
+import time
+import typing
+import urllib.request
+from urllib.error import URLError
+
+import pytest
+
+from devenv.lib import httppool
+
+DATA = b"foo\n" * 1000
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self) -> None:
+        super().setup()
+        Handler.connections += 1
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/data")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/slow":
+            time.sleep(0.5)
+
+        self.send_response(200)
+        self.send_header("Content-Length", f"{len(DATA)}")
+        self.end_headers()
+        self.wfile.write(DATA)
+        if self.path == "/drop":
+            # without saying so
+            self.close_connection = True
+
+
+@pytest.fixture
+def server() -> typing.Generator[str, None, None]:
+    Handler.connections = 0
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(
+        target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    t.start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    finally:
+        httppool.clear()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def get(url: str) -> bytes:
+    with httppool.urlopen(urllib.request.Request(url)) as resp:
+        return resp.read()
+
+
+def test_reused(server: str) -> None:
+    for _ in range(3):
+        assert get(f"{server}/data") == DATA
+    assert Handler.connections == 1
+
+
+def test_redirect(server: str) -> None:
+    assert get(f"{server}/redirect") == DATA
+    assert Handler.connections == 1
+
+
+def test_unread_not_reused(server: str) -> None:
+    with httppool.urlopen(urllib.request.Request(f"{server}/data")) as resp:
+        assert resp.read(4) == b"foo\n"
+
+    assert get(f"{server}/data") == DATA
+    assert Handler.connections == 2
+
+
+def test_stale(server: str) -> None:
+    assert get(f"{server}/drop") == DATA
+    # the pooled connection is dead, so this retries on a fresh one
+    assert get(f"{server}/data") == DATA
+    assert Handler.connections == 2
+
+
+def test_timeout_reused(server: str) -> None:
+    assert get(f"{server}/data") == DATA
+    # the pooled connection was made without a timeout, but this one has one
+    with pytest.raises(URLError):
+        httppool.urlopen(urllib.request.Request(f"{server}/slow"), 0.1)
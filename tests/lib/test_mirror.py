@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import hashlib
+import pathlib
+import threading
+import typing
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import pytest
+
+from devenv.lib import cache
+from devenv.lib import config
+from devenv.lib import mirror
+
+DATA = b"foo\n" * 1000
+DATA_SHA256 = hashlib.sha256(DATA).hexdigest()
+
+
+def test_urls(tmp_path: pathlib.Path) -> None:
+    global_config = tmp_path / "config.ini"
+    global_config.write_text("""
+[mirror]
+rewrite =
+    https://github.com/ https://proxy.example.com/github/
+    https://github.com/getsentry/ https://unused.example.com/
+mirrors =
+    http://devbox.local:8750/
+    https://mirror.example.com
+""")
+
+    with mock.patch.object(config, "global_config_path", f"{global_config}"):
+        assert mirror.urls("https://github.com/getsentry/foo", "a" * 64) == [
+            "https://proxy.example.com/github/getsentry/foo",
+            f"http://devbox.local:8750/{'a' * 64}",
+            f"https://mirror.example.com/{'a' * 64}",
+        ]
+        assert mirror.urls("https://example.com/foo", "a" * 64) == [
+            f"http://devbox.local:8750/{'a' * 64}",
+            f"https://mirror.example.com/{'a' * 64}",
+        ]
+
+
+def test_urls_unconfigured(tmp_path: pathlib.Path) -> None:
+    with mock.patch.object(
+        config, "global_config_path", f"{tmp_path}/config.ini"
+    ):
+        assert mirror.urls("https://example.com/foo", "a" * 64) == []
+
+
+@pytest.fixture
+def server(tmp_path: pathlib.Path) -> typing.Generator[str, None, None]:
+    (tmp_path / DATA_SHA256).write_bytes(DATA)
+    with (
+        mock.patch.object(cache, "cache_root", f"{tmp_path}"),
+        mirror.server("127.0.0.1", 0) as httpd,
+    ):
+        t = threading.Thread(
+            target=httpd.serve_forever,
+            kwargs={"poll_interval": 0.01},
+            daemon=True,
+        )
+        t.start()
+        try:
+            yield f"http://127.0.0.1:{httpd.server_address[1]}"
+        finally:
+            httpd.shutdown()
+
+
+def get(url: str, headers: dict[str, str] | None = None) -> tuple[int, bytes]:
+    req = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, b""
+
+
+def test_serve(server: str) -> None:
+    assert get(f"{server}/{DATA_SHA256}") == (200, DATA)
+    assert cache.entries()[DATA_SHA256].size == len(DATA)
+
+
+def test_serve_range(server: str) -> None:
+    url = f"{server}/{DATA_SHA256}"
+    assert get(url, {"Range": "bytes=4-7"}) == (206, DATA[4:8])
+    assert get(url, {"Range": "bytes=3996-"}) == (206, DATA[3996:])
+    assert get(url, {"Range": "bytes=-4"}) == (206, DATA[-4:])
+    assert get(url, {"Range": f"bytes={len(DATA)}-"}) == (416, b"")
+    assert get(url, {"Range": "bytes=4-7", "If-Range": f'"{DATA_SHA256}"'}) == (
+        206,
+        DATA[4:8],
+    )
+    # a different validator means start over
+    assert get(url, {"Range": "bytes=4-7", "If-Range": '"nope"'}) == (200, DATA)
+
+
+def test_serve_not_found(server: str) -> None:
+    assert get(f"{server}/{'a' * 64}") == (404, b"")
+    assert get(f"{server}/index.json") == (404, b"")
+    assert get(f"{server}/../{DATA_SHA256}") == (404, b"")
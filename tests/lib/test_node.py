@@ -16,11 +16,10 @@ def test_install_pnpm(tmp_path: pathlib.Path) -> None:
     open(f"{binroot}/node", "w").close()
 
     with (
-        patch("devenv.lib.archive.download"),
         patch(
-            "devenv.lib.archive.unpack",
-            side_effect=lambda archive_file, tmpd, perform_strip1, strip1_new_prefix: (
-                os.makedirs(f"{tmpd}/{strip1_new_prefix}")
+            "devenv.lib.archive.unpack_cached",
+            side_effect=lambda url, sha256, tmpd, n, new_prefix: os.makedirs(
+                f"{tmpd}/{new_prefix}"
             ),
         ),
         patch("devenv.lib.node.os.path.exists"),
@@ -41,3 +40,20 @@ export NPM_CONFIG_PREFIX={binroot}/node-env
 exec {binroot}/node-env/bin/npm "$@"
 """
         )
+
+
+def test_install_unchanged(tmp_path: pathlib.Path) -> None:
+    repo = Repository(f"{tmp_path}/test")
+
+    binroot = f"{repo.path}/.devenv/bin"
+    os.makedirs(f"{binroot}/node-env/bin")
+    for fp in (f"{binroot}/node", f"{binroot}/node-env/bin/node"):
+        open(fp, "w").close()
+        os.chmod(fp, 0o755)
+
+    with patch("devenv.lib.node.proc.run", side_effect=["v0.0.0"]) as run:
+        node.install("v0.0.0", "bar", "baz", repo.path)
+        node.install("v0.0.0", "bar", "baz", repo.path)
+
+    # the second install didn't need to probe node --version
+    assert len(run.mock_calls) == 1
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import os
+import pathlib
+from unittest import mock
+
+from devenv.constants import SYSTEM_MACHINE
+from devenv.lib import cache
+from devenv.lib import prefetch
+
+
+def test_prefetch(tmp_path: pathlib.Path) -> None:
+    reporoot = f"{tmp_path}/repo"
+    os.makedirs(f"{reporoot}/devenv")
+    with open(f"{reporoot}/devenv/config.ini", "w") as f:
+        f.write(f"""
+[tenv]
+version = v1.3.0
+{SYSTEM_MACHINE} = https://example.com/tenv
+{SYSTEM_MACHINE}_sha256 = {"a" * 64}
+other_machine = https://example.com/tenv-other
+other_machine_sha256 = {"b" * 64}
+
+[venv.foo]
+python = 3.11.6
+
+[python3.11.6]
+{SYSTEM_MACHINE} = https://example.com/python
+{SYSTEM_MACHINE}_sha256 = {"c" * 64}
+
+[python]
+{SYSTEM_MACHINE} = https://example.com/python
+{SYSTEM_MACHINE}_sha256 = {"c" * 64}
+
+[node]
+{SYSTEM_MACHINE} = https://example.com/node
+{SYSTEM_MACHINE}_sha256 = {"d" * 64}
+""")
+
+    cache_root = f"{tmp_path}/cache"
+    os.makedirs(cache_root)
+    # already downloaded
+    open(f"{cache_root}/{'d' * 64}", "w").close()
+
+    with (
+        mock.patch.object(cache, "cache_root", cache_root),
+        mock.patch("devenv.lib.archive.download") as mock_download,
+    ):
+        downloaded = prefetch.prefetch(reporoot)
+
+    assert downloaded == [
+        prefetch.Artifact("tenv", "https://example.com/tenv", "a" * 64),
+        prefetch.Artifact(
+            "python3.11.6", "https://example.com/python", "c" * 64
+        ),
+    ]
+    assert sorted(mock_download.mock_calls) == [
+        mock.call("https://example.com/python", "c" * 64),
+        mock.call("https://example.com/tenv", "a" * 64),
+    ]
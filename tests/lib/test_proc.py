@@ -1,10 +1,16 @@
 from __future__ import annotations
 
 import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
 from unittest.mock import patch
 
 import pytest
 
+from devenv.lib.proc import Scope
 from devenv.lib.proc import run
 
 
@@ -116,3 +122,89 @@ bar
 
 """
         )
+
+
+def test_run_offline() -> None:
+    cmd = ("sh", "-c", "echo $UV_OFFLINE $PIP_NO_INDEX")
+
+    with patch("devenv.lib.proc.offline.enabled", True):
+        assert run(cmd, stdout=True) == "1 1"
+
+    assert run(cmd, stdout=True) == ""
+
+
+def _running(pid: int) -> bool:
+    # (zombies don't count, whatever reaps them might take a while)
+    stat = subprocess.run(
+        ("ps", "-o", "stat=", "-p", f"{pid}"), capture_output=True, text=True
+    ).stdout.strip()
+    return bool(stat) and not stat.startswith("Z")
+
+
+def test_run_scope_kill(tmp_path: str) -> None:
+    pidfile = f"{tmp_path}/pid"
+    scope = Scope()
+    errors: list[Exception] = []
+
+    def target() -> None:
+        with scope:
+            try:
+                # the grandchild has to go too
+                run(("sh", "-c", f"sleep 60 & echo $! > {pidfile}; wait"))
+            except RuntimeError as e:
+                errors.append(e)
+
+    t = threading.Thread(target=target)
+    t.start()
+    while not os.path.exists(pidfile) or not open(pidfile).read():
+        time.sleep(0.01)
+    with open(pidfile) as f:
+        grandchild = int(f.read())
+
+    scope.kill()
+    t.join(timeout=5)
+    assert not t.is_alive()
+    assert len(errors) == 1
+    assert "(code -9)" in f"{errors[0]}"
+
+    for _ in range(500):
+        if not _running(grandchild):
+            break
+        time.sleep(0.01)
+    else:
+        raise AssertionError("grandchild is still running")
+
+
+def test_run_scope_killed() -> None:
+    scope = Scope()
+    scope.kill()
+    with scope, pytest.raises(RuntimeError):
+        run(("sleep", "60"))
+
+
+def test_run_scope_tty() -> None:
+    # runs in its own session whose controlling terminal is a pty,
+    # like an interactive devenv doctor
+    script = textwrap.dedent("""
+        import os, pty, signal, sys, time
+
+        pid, fd = pty.fork()
+        if pid == 0:
+            from devenv.lib.proc import Scope, run
+
+            with Scope():
+                try:
+                    run(("sh", "-c", "read x"))
+                except RuntimeError:
+                    pass
+            os._exit(0)
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if os.waitpid(pid, os.WNOHANG)[0]:
+                sys.exit(0)
+            time.sleep(0.05)
+        os.killpg(pid, signal.SIGKILL)
+        sys.exit("stuck reading from the terminal")
+    """)
+    subprocess.run((sys.executable, "-c", script), check=True, timeout=30)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import os
+import pathlib
+from unittest.mock import patch
+
+from devenv.lib import state
+
+
+def test_unchanged(tmp_path: pathlib.Path) -> None:
+    reporoot = f"{tmp_path}"
+    output = tmp_path / "output"
+    output.write_text("hi")
+
+    inputs = state.fingerprint("v1.0.0", "https://example.com/foo", "abc")
+
+    assert not state.unchanged(reporoot, "foo", inputs, (f"{output}",))
+    state.record(reporoot, "foo", inputs, (f"{output}",))
+    assert state.unchanged(reporoot, "foo", inputs, (f"{output}",))
+
+    # different inputs
+    assert not state.unchanged(
+        reporoot,
+        "foo",
+        state.fingerprint("v1.0.1", "https://example.com/foo", "abc"),
+        (f"{output}",),
+    )
+
+    # forced
+    with patch.object(state, "force", True):
+        assert not state.unchanged(reporoot, "foo", inputs, (f"{output}",))
+
+    # output was replaced
+    output.unlink()
+    assert not state.unchanged(reporoot, "foo", inputs, (f"{output}",))
+    output.write_text("hi")
+    assert not state.unchanged(reporoot, "foo", inputs, (f"{output}",))
+
+
+def test_record_missing_output(tmp_path: pathlib.Path) -> None:
+    reporoot = f"{tmp_path}"
+    inputs = state.fingerprint("foo")
+    outputs = (f"{tmp_path}/does-not-exist",)
+
+    state.record(reporoot, "foo", inputs, outputs)
+    assert os.listdir(state.state_root(reporoot)) == [".gitignore"]
+
+
+def test_file_digest(tmp_path: pathlib.Path) -> None:
+    fp = tmp_path / "requirements.txt"
+    missing = state.file_digest(f"{fp}")
+    fp.write_text("")
+    empty = state.file_digest(f"{fp}")
+    fp.write_text("foo==1.0.0\n")
+    assert len({missing, empty, state.file_digest(f"{fp}")}) == 3
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from devenv.lib import proc
+from devenv.lib import tasks
+
+
+def test_deps_ordering() -> None:
+    order: list[str] = []
+
+    graph = tasks.Graph()
+    graph.add("sync", lambda: order.append("sync"), deps=("venv",))
+    graph.add("venv", lambda: order.append("venv"), deps=("python",))
+    graph.add("python", lambda: order.append("python"))
+    graph.run()
+
+    assert order == ["python", "venv", "sync"]
+
+
+def test_concurrent() -> None:
+    # would deadlock (and time out) unless both run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    graph = tasks.Graph(max_workers=2)
+    graph.add("node", barrier.wait)
+    graph.add("tenv", barrier.wait)
+    graph.run()
+
+
+def test_output_grouped(capsys: pytest.CaptureFixture[str]) -> None:
+    barrier = threading.Barrier(2, timeout=5)
+
+    def task(name: str) -> None:
+        print(f"{name} 1")
+        barrier.wait()
+        print(f"{name} 2")
+        proc.run(("echo", f"{name} 3"))
+
+    graph = tasks.Graph(max_workers=2)
+    graph.add("a", lambda: task("a"))
+    graph.add("b", lambda: task("b"), deps=())
+    graph.run()
+
+    lines = capsys.readouterr().out.splitlines()
+    for name in ("a", "b"):
+        i = next(
+            i for i, line in enumerate(lines) if line.startswith(f"✅ {name}")
+        )
+        assert lines[i + 1 : i + 4] == [f"{name} 1", f"{name} 2", f"{name} 3"]
+
+
+def test_errors_aggregated(capsys: pytest.CaptureFixture[str]) -> None:
+    ran: list[str] = []
+
+    def fail(msg: str) -> None:
+        raise SystemExit(msg)
+
+    graph = tasks.Graph()
+    graph.add("tenv", lambda: fail("failed to install tenv"))
+    graph.add("python", lambda: fail("failed to install python"))
+    graph.add("venv", lambda: ran.append("venv"), deps=("python",))
+    graph.add("sync", lambda: ran.append("sync"), deps=("venv",))
+    graph.add("node", lambda: ran.append("node"))
+
+    with pytest.raises(SystemExit) as excinfo:
+        graph.run()
+
+    assert ran == ["node"]
+    assert f"{excinfo.value}".splitlines() == [
+        "2 task(s) failed:",
+        "- tenv: failed to install tenv",
+        "- python: failed to install python",
+        "skipped: sync, venv",
+    ]
+
+
+def test_failed_subprocess_output(capsys: pytest.CaptureFixture[str]) -> None:
+    graph = tasks.Graph()
+    graph.add("fail", lambda: proc.run(("sh", "-c", "echo oops; exit 1")))
+
+    with pytest.raises(SystemExit) as excinfo:
+        graph.run()
+
+    assert "oops" in capsys.readouterr().out
+    assert f"{excinfo.value}".splitlines() == [
+        "1 task(s) failed:",
+        "- fail: Command `sh -c 'echo oops; exit 1'` failed! (code 1)",
+    ]
+
+
+def test_invalid() -> None:
+    graph = tasks.Graph()
+    graph.add("a", lambda: None, deps=("b",))
+    with pytest.raises(ValueError) as excinfo:
+        graph.run()
+    assert f"{excinfo.value}" == "task a depends on unknown b"
+
+    graph.add("b", lambda: None, deps=("a",))
+    with pytest.raises(ValueError) as excinfo:
+        graph.run()
+    assert f"{excinfo.value}" == "dependency cycle between tasks: a, b"
+
+    with pytest.raises(ValueError):
+        graph.add("a", lambda: None)
+
+
+def test_max_workers() -> None:
+    lock = threading.Lock()
+    running: list[str] = []
+    most = 0
+
+    def task(name: str) -> None:
+        nonlocal most
+        with lock:
+            running.append(name)
+            most = max(most, len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(name)
+
+    graph = tasks.Graph(max_workers=2)
+    for name in "abcde":
+        graph.add(name, functools.partial(task, name))
+    graph.run()
+
+    assert most == 2
+
+
+def test_interrupted() -> None:
+    release = threading.Event()
+
+    graph = tasks.Graph()
+    graph.add("download", release.wait)
+    timer = threading.Timer(2, release.set)
+    timer.start()
+
+    start = time.monotonic()
+    # ctrl-c while waiting on the download
+    with (
+        mock.patch.object(tasks, "wait", side_effect=KeyboardInterrupt),
+        pytest.raises(KeyboardInterrupt),
+    ):
+        graph.run()
+    # didn't wait for it to finish
+    assert time.monotonic() - start < 1
+    timer.cancel()
+    release.set()
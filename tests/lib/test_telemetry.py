@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import configparser
+from unittest import mock
+
+from devenv.lib import telemetry
+
+
+def test_init() -> None:
+    cfg = configparser.ConfigParser()
+    with mock.patch("sentry_sdk.init") as mock_init:
+        telemetry.init(cfg)
+
+    mock_init.assert_called_once_with(
+        dsn=telemetry.DSN,
+        traces_sample_rate=telemetry.DEFAULT_TRACES_SAMPLE_RATE,
+        shutdown_timeout=telemetry.DEFAULT_FLUSH_TIMEOUT,
+    )
+
+
+def test_init_configured() -> None:
+    cfg = configparser.ConfigParser()
+    cfg.read_string("""
+[telemetry]
+traces_sample_rate = 1
+flush_timeout = 0.5
+""")
+    with mock.patch("sentry_sdk.init") as mock_init:
+        telemetry.init(cfg)
+
+    mock_init.assert_called_once_with(
+        dsn=telemetry.DSN, traces_sample_rate=1.0, shutdown_timeout=0.5
+    )
+
+
+def test_init_disabled() -> None:
+    cfg = configparser.ConfigParser()
+    cfg.read_string("[telemetry]\nenabled = false\n")
+    with mock.patch("sentry_sdk.init") as mock_init:
+        telemetry.init(cfg)
+
+    mock_init.assert_not_called()
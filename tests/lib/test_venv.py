@@ -5,6 +5,8 @@ import pathlib
 from unittest.mock import call
 from unittest.mock import patch
 
+import pytest
+
 from devenv.lib import config
 from devenv.lib import venv
 from devenv.lib.repository import Repository
@@ -86,3 +88,225 @@ def test_get_ensure(tmp_path: pathlib.Path) -> None:
 
     # unittesting venv.sync(venv_dir, requirements, editable_paths, bins)
     # isn't really useful and is covered better with integration
+
+
+def test_sync_stamp(tmp_path: pathlib.Path) -> None:
+    reporoot = f"{tmp_path}"
+    venv_dir = f"{tmp_path}/.venv"
+    requirements = f"{tmp_path}/requirements.txt"
+    editable = f"{tmp_path}/lib"
+
+    os.makedirs(f"{venv_dir}/bin")
+    os.makedirs(editable)
+    with open(f"{venv_dir}/pyvenv.cfg", "w") as f:
+        f.write("version = 3.11.6\n")
+    with open(requirements, "w") as f:
+        f.write("foo==1.0.0\n")
+    with open(f"{editable}/pyproject.toml", "w") as f:
+        f.write("")
+
+    with patch("devenv.lib.venv.proc.run") as mock_run:
+        venv.sync(reporoot, venv_dir, requirements, (editable,))
+        venv.sync(reporoot, venv_dir, requirements, (editable,))
+        # nothing changed
+        assert len(mock_run.mock_calls) == 1
+
+        with open(requirements, "w") as f:
+            f.write("foo==1.0.1\n")
+        venv.sync(reporoot, venv_dir, requirements, (editable,))
+        assert len(mock_run.mock_calls) == 2
+
+        with open(f"{editable}/pyproject.toml", "w") as f:
+            f.write("[project]\n")
+        venv.sync(reporoot, venv_dir, requirements, (editable,))
+        assert len(mock_run.mock_calls) == 3
+
+        with open(f"{venv_dir}/pyvenv.cfg", "w") as f:
+            f.write("version = 3.11.8\n")
+        venv.sync(reporoot, venv_dir, requirements, (editable,))
+        assert len(mock_run.mock_calls) == 4
+
+        venv.sync(reporoot, venv_dir, requirements, (editable,))
+        assert len(mock_run.mock_calls) == 4
+
+    # recreating the venv invalidates the stamp
+    with (
+        patch("devenv.lib.venv.proc.run"),
+        patch("devenv.lib.venv.pythons.get", return_value="python"),
+        patch("shutil.rmtree"),
+    ):
+        venv.ensure(venv_dir, "3.11.6", "url", "sha256")
+    assert not os.path.exists(f"{venv_dir}/.devenv-sync-stamp")
+
+
+def test_uv_installer(tmp_path: pathlib.Path) -> None:
+    repo = Repository(f"{tmp_path}/ops")
+
+    os.makedirs(repo.config_path)
+    with open(f"{repo.config_path}/config.ini", "w") as f:
+        f.write(
+            mock_config.replace(
+                "[venv.sentry-kube]\n", "[venv.sentry-kube]\ninstaller = uv\n"
+            )
+        )
+
+    venv_dir, python_version, requirements, editable_paths, bins = venv.get(
+        repo.path, "sentry-kube"
+    )
+    installer = venv.get_installer(repo.path, "sentry-kube")
+    assert installer == "uv"
+
+    url, sha256 = config.get_python(repo.path, python_version)
+    env = {"UV_CACHE_DIR": venv.uv_cache_dir}
+
+    with (
+        patch("devenv.lib.venv.proc.run") as mock_run,
+        patch("devenv.lib.venv.pythons.get", return_value="python"),
+        patch("devenv.lib.venv.shutil.which", return_value="/bin/uv"),
+        patch("devenv.lib.venv.fs.ensure_symlink"),
+        patch("shutil.rmtree"),
+    ):
+        os.makedirs(venv_dir)
+        venv.ensure(venv_dir, python_version, url, sha256, installer=installer)
+        venv.sync(
+            repo.path,
+            venv_dir,
+            requirements,
+            editable_paths,
+            bins,
+            installer=installer,
+        )
+        assert mock_run.mock_calls == [
+            call(
+                ("/bin/uv", "venv", "--quiet", "--python", "python", venv_dir),
+                exit=True,
+                env=env,
+            ),
+            call(
+                (
+                    "/bin/uv",
+                    "pip",
+                    "install",
+                    "--quiet",
+                    "--python",
+                    f"{venv_dir}/bin/python",
+                    "-r",
+                    requirements,
+                    "-e",
+                    f"{repo.path}/k8s/cli",
+                    "-e",
+                    f"{repo.path}/k8s/cli/libsentrykube",
+                ),
+                env=env,
+            ),
+        ]
+
+
+def test_uv_binroot(tmp_path: pathlib.Path) -> None:
+    reporoot = f"{tmp_path}/repo"
+    binroot = f"{reporoot}/.devenv/bin"
+    os.makedirs(binroot)
+    with open(f"{binroot}/uv", "w") as f:
+        f.write("#!/bin/sh\n")
+    os.chmod(f"{binroot}/uv", 0o755)
+
+    with patch("devenv.lib.venv.proc.base_path", "/nonexistent"):
+        # installed by devenv.lib.uv.install, but not on PATH
+        assert venv._uv(reporoot)[0] == f"{binroot}/uv"
+        with pytest.raises(SystemExit):
+            venv._uv()
+
+
+def test_get_installer_invalid(tmp_path: pathlib.Path) -> None:
+    repo = Repository(f"{tmp_path}/ops")
+
+    os.makedirs(repo.config_path)
+    with open(f"{repo.config_path}/config.ini", "w") as f:
+        f.write("[venv.foo]\ninstaller = poetry\n[venv.bar]\n")
+
+    assert venv.get_installer(repo.path, "bar") == "pip"
+    with pytest.raises(ValueError):
+        venv.get_installer(repo.path, "foo")
+
+
+def test_ensure_from_template(tmp_path: pathlib.Path) -> None:
+    requirements = f"{tmp_path}/requirements.txt"
+    with open(requirements, "w") as f:
+        f.write("foo==1.0.0\n")
+
+    def create(python: str, venv_dir: str, *args: object) -> None:
+        os.makedirs(f"{venv_dir}/bin")
+        os.makedirs(f"{venv_dir}/lib/site-packages")
+        os.symlink(python, f"{venv_dir}/bin/python")
+        with open(f"{venv_dir}/pyvenv.cfg", "w") as f:
+            f.write(
+                f"version = 3.11.6\ncommand = {python} -m venv {venv_dir}\n"
+            )
+
+    def install(venv_dir: str, *args: object) -> None:
+        with open(f"{venv_dir}/bin/foo", "w") as f:
+            f.write(f"#!{venv_dir}/bin/python\n")
+        with open(f"{venv_dir}/lib/site-packages/foo.py", "w") as f:
+            f.write("")
+
+    with (
+        patch.object(venv, "templates_root", f"{tmp_path}/templates"),
+        patch("devenv.lib.venv.pythons.get", return_value="/bin/python3"),
+        patch("devenv.lib.fs.DARWIN", False),
+        patch("devenv.lib.venv._create", side_effect=create) as mock_create,
+        patch("devenv.lib.venv._install", side_effect=install),
+    ):
+        for name in ("a", "b"):
+            venv.ensure(
+                f"{tmp_path}/{name}",
+                "3.11.6",
+                "url",
+                "sha256",
+                requirements=requirements,
+            )
+
+    # only the template was ever created
+    assert len(mock_create.mock_calls) == 1
+    (tpl,) = (
+        f"{tmp_path}/templates/{name}"
+        for name in os.listdir(f"{tmp_path}/templates")
+        if not name.endswith(".lock")
+    )
+
+    for name in ("a", "b"):
+        venv_dir = f"{tmp_path}/{name}"
+        assert venv.check(venv_dir, "3.11.6") == venv.VenvStatus.OK
+        assert os.readlink(f"{venv_dir}/bin/python") == "/bin/python3"
+        with open(f"{venv_dir}/bin/foo") as f:
+            assert f.read() == f"#!{venv_dir}/bin/python\n"
+        with open(f"{venv_dir}/pyvenv.cfg") as f:
+            assert f"-m venv {venv_dir}\n" in f.read()
+        # installed packages are shared with the template
+        assert os.path.samefile(
+            f"{venv_dir}/lib/site-packages/foo.py",
+            f"{tpl}/lib/site-packages/foo.py",
+        )
+        assert not os.path.exists(f"{venv_dir}/.devenv-template")
+
+    # ...which is left untouched
+    with open(f"{tpl}/bin/foo") as f:
+        assert f.read() == f"#!{tpl}/bin/python\n"
+
+
+def test_prune_templates(tmp_path: pathlib.Path) -> None:
+    templates_root = tmp_path / "templates"
+    for i, name in enumerate(("old", "new")):
+        (templates_root / name).mkdir(parents=True)
+        marker = templates_root / name / ".devenv-template"
+        marker.touch()
+        os.utime(marker, (i, i))
+        (templates_root / f"{name}.lock").touch()
+
+    with (
+        patch.object(venv, "templates_root", f"{templates_root}"),
+        patch.object(venv, "MAX_TEMPLATES", 1),
+    ):
+        venv._prune_templates()
+
+    # lockfiles stay, someone might be waiting on them
+    assert sorted(os.listdir(templates_root)) == ["new", "new.lock", "old.lock"]
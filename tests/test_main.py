@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import importlib
 import os
+import subprocess
+import sys
 from unittest.mock import patch
 
+import pytest
+
+from devenv import constants
 from devenv import main
 from devenv.lib.config import read_config
 
@@ -21,3 +27,59 @@ def test(tmp_path: str) -> None:
 
         config = read_config(config_path)
         assert config.get("devenv", "coderoot") == coderoot
+
+
+def test_commands() -> None:
+    for command, (module, help) in main.COMMANDS.items():
+        info = importlib.import_module(module).module_info
+        assert (info.command, info.help) == (command, help)
+
+
+def test_startup_imports() -> None:
+    # guards devenv's startup time: importing devenv.main mustn't pull
+    # in any command (or what they import) until it runs
+    out = subprocess.check_output(
+        (
+            sys.executable,
+            "-c",
+            "import sys, devenv.main; print(*sorted(sys.modules), sep='\\n')",
+        ),
+        text=True,
+    )
+    imported = set(out.split())
+
+    assert "devenv.main" in imported
+    for module, _ in main.COMMANDS.values():
+        assert module not in imported
+    for module in (
+        "devenv.lib.archive",
+        "devenv.lib.colima",
+        "devenv.lib.docker",
+        "importlib.metadata",
+        "sentry_sdk",
+        "urllib.request",
+    ):
+        assert module not in imported
+
+
+@pytest.mark.parametrize(
+    ("argv", "quiet"),
+    (
+        ((), True),
+        (("--version",), True),
+        (("sync", "--help"), True),
+        (("cache", "stats"), True),
+        (("colima", "check"), True),
+        (("colima", "start"), False),
+        (("sync",), False),
+        (("sync", "--force"), False),
+    ),
+)
+def test_quiet(argv: tuple[str, ...], quiet: bool) -> None:
+    assert main._quiet(("/path/to/argv0", *argv)) is quiet
+
+
+def test_version(capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.raises(SystemExit):
+        main.devenv(("/path/to/argv0", "--version"), "/dev/null")
+    assert capsys.readouterr().out == f"{constants.version}\n"
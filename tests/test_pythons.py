@@ -1,20 +1,45 @@
 from __future__ import annotations
 
+import os
+import pathlib
 import sys
 from unittest.mock import patch
 
 from devenv import pythons
-from devenv.constants import root
 
 
-def test_get() -> None:
+def _unpack(url: str, sha256: str, into: str) -> None:
+    os.makedirs(f"{into}/python/bin")
+    open(f"{into}/python/bin/python3", "w").close()
+
+
+def test_get(tmp_path: pathlib.Path) -> None:
+    with (
+        patch("devenv.pythons.root", f"{tmp_path}"),
+        patch("devenv.lib.archive.unpack_cached", side_effect=_unpack),
+        patch("devenv.pythons.FORCE_PY", True),
+    ):
+        path = pythons.get("3.12.0", "foo", "bar")
+        assert path == f"{tmp_path}/pythons/3.12.0/python/bin/python3"
+
+    assert os.listdir(f"{tmp_path}/pythons/3.12.0") == ["python"]
+
+
+def test_get_interrupted(tmp_path: pathlib.Path) -> None:
+    # left behind by an install that didn't finish
+    leftover = tmp_path / "pythons/3.12.0/python/lib"
+    leftover.mkdir(parents=True)
+    (leftover / "os.py").touch()
+
     with (
-        patch("devenv.lib.archive.download"),
-        patch("devenv.lib.archive.unpack"),
-        patch("os.path.exists", side_effect=[False, True]),
+        patch("devenv.pythons.root", f"{tmp_path}"),
+        patch("devenv.lib.archive.unpack_cached", side_effect=_unpack),
+        patch("devenv.pythons.FORCE_PY", True),
     ):
         path = pythons.get("3.12.0", "foo", "bar")
-        assert path == f"{root}/pythons/3.12.0/python/bin/python3"
+
+    assert os.path.exists(path)
+    assert not leftover.exists()
 
 
 def test_get_system() -> None:
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import email.message
+import io
 import os
 import pathlib
 from collections.abc import Iterator
 
+from typing_extensions import Buffer
+
 
 def sorted_os_walk(
     path: pathlib.Path,
@@ -12,3 +16,38 @@ def sorted_os_walk(
         b.sort()
         c.sort()
         yield a, b, c
+
+
+class Response(io.BytesIO):
+    def __init__(
+        self,
+        data: bytes,
+        status: int = 200,
+        headers: dict[str, str] | None = None,
+        fail_after: int = -1,
+    ) -> None:
+        super().__init__(data)
+        self.status = status
+        self.headers = email.message.Message()
+        for k, v in (headers or {}).items():
+            self.headers[k] = v
+        self.fail_after = fail_after
+
+    def readinto(self, b: Buffer) -> int:
+        if self.fail_after == 0:
+            raise ConnectionResetError("connection reset by peer")
+        if self.fail_after > 0:
+            b = memoryview(b)[: self.fail_after]
+        n = super().readinto(b)
+        if self.fail_after > 0:
+            self.fail_after = max(self.fail_after - n, 0)
+        return n
+
+    def read(self, size: int | None = -1) -> bytes:
+        if self.fail_after < 0:
+            return super().read(size)
+        if size is None or size < 0:
+            size = len(self.getvalue()) - self.tell()
+        b = bytearray(size)
+        n = self.readinto(b)
+        return bytes(b[:n])